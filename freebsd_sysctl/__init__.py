@@ -23,26 +23,46 @@
 # POSSIBILITY OF SUCH DAMAGE.
 import typing
 import ctypes
+import errno
 import struct
-import enum
+import freebsd_sysctl.buffers
+import freebsd_sysctl.cache
 import freebsd_sysctl.libc
 import freebsd_sysctl.types
 import freebsd_sysctl.flags
 
 from freebsd_sysctl.__version__ import __version__
+from freebsd_sysctl.libc import SysctlError
 
 NULL_BYTES = b"\x00"
-CTL_MAXNAME = ctypes.c_uint(24)
+CTL_MAXNAME = ctypes.c_uint(freebsd_sysctl.buffers.CTL_MAXNAME)
 T_OID = (ctypes.c_int * 2)
-BUFSIZ = 1024 # see /include/stdio.h#L209
+BUFSIZ = freebsd_sysctl.buffers.BUFSIZ
+SIZE_HEADROOM = 8  # grow buffers by 1/8 of the last observed size
+DUMP_QUEUE_DEPTH = 16  # records enumerated ahead per dump worker
+
+NameOrOid = typing.Union[str, typing.List[int]]
+BatchKey = typing.Union[str, typing.Tuple[int, ...]]
+WritableBuffer = typing.Union[bytearray, memoryview, ctypes.Array]
 
 
 class Sysctl:
 
+    __slots__ = (
+        "_name",
+        "_oid",
+        "_kind",
+        "_fmt",
+        "_size",
+        "_value",
+        "_description",
+        "_ctl_type"
+    )
+
     _name: typing.Optional[str]
     _oid: typing.Optional[typing.List[int]]
     _kind: typing.Optional[int]
-    _fmt = typing.Optional[str]
+    _fmt: typing.Optional[str]
     _size: typing.Optional[int]
     _value: typing.Optional[typing.Any]
     _description: typing.Optional[str]
@@ -59,21 +79,32 @@ class Sysctl:
         self._size = None
         self._value = None
         self._description = None
+        self._ctl_type = None
 
     @property
     def oid(self) -> typing.List[int]:
         if self._oid is None:
-            if self.name is None:
+            if self._name is None:
                 raise ValueError("Name or OID required")
-            self._oid = self.name2oid(self.name)
+            oid = freebsd_sysctl.cache.mib_cache.oid(self._name)
+            if oid is None:
+                oid = self.name2oid(self._name)
+                freebsd_sysctl.cache.mib_cache.update(oid, name=self._name)
+            self._oid = oid
         return self._oid
 
     @property
     def name(self) -> str:
         if self._name is None:
-            if self.oid is None:
+            if self._oid is None:
                 raise ValueError("Name or OID required")
-            self._name = self.oid2name(self.oid)
+            cached = freebsd_sysctl.cache.mib_cache.get(self._oid, "name")
+            if cached is None:
+                name = self.oid2name(self._oid)
+                freebsd_sysctl.cache.mib_cache.update(self._oid, name=name)
+            else:
+                name, = cached
+            self._name = name
         return self._name
 
     @property
@@ -97,19 +128,69 @@ class Sysctl:
     @property
     def raw_value(self) -> typing.Any:
         if self._value is None:
-            self._value = self.query_value(self.oid, self.size, self.ctl_type)
+            self._value = self.read_value(self.oid, self.ctl_type)
+            self._size = self._value.size
         return self._value
 
+    @property
+    def raw_view(self) -> memoryview:
+        """Return a bytes memoryview on the raw value without copying it."""
+        raw_value = self.raw_value
+        return memoryview(raw_value.data).cast("B")[:raw_value.size]
+
+    def read_into(self, buffer: WritableBuffer) -> int:
+        """Read the raw value into a writable buffer without copying.
+
+        A bytearray is grown when the kernel reports it was too small.
+        Returns the number of bytes written.
+        """
+        while True:
+            result, length = self.query_into(self.oid, buffer)
+            if result == 0:
+                return length
+            error = ctypes.get_errno()
+            growable = isinstance(buffer, bytearray)
+            if (error != errno.ENOMEM) or (growable is False):
+                raise SysctlError(error, self.name)
+            size = self.query_size(self.oid, self.ctl_type)
+            buffer.extend(bytes(max(size, 2 * len(buffer)) - len(buffer)))
+
     @property
     def value(self) -> typing.Any:
-        if type(self.raw_value.value) == str:
-            return self.raw_value.value.strip("\n")
-        return self.raw_value.value
+        return self.decode_value(self.raw_value)
+
+    @value.setter
+    def value(self, value: typing.Any) -> None:
+        error = self.write_value(self.oid, self.encode_value(value))
+        if error != 0:
+            raise SysctlError(error, self.name)
+
+    def encode_value(self, value: typing.Any) -> bytes:
+        """Return the raw bytes of a new value after checking writability."""
+        if self.has_flag(freebsd_sysctl.flags.WR) is False:
+            hint = ""
+            if self.has_flag(freebsd_sysctl.flags.TUN) is True:
+                hint = " (loader tunable)"
+            raise SysctlError(errno.EPERM, f"{self.name} is read-only{hint}")
+        self._value = None
+        self._size = None
+        return self.ctl_type.encode(value)
 
     @property
     def description(self) -> str:
         if self._description is None:
-            self._description = self.query_description(self.oid)
+            cache = freebsd_sysctl.cache.mib_cache
+            cached = cache.get(self.oid, "description")
+            if cached is None:
+                description = self.query_description(self.oid)
+                cache.update(
+                    self.oid,
+                    kind=self.kind,
+                    description=description
+                )
+            else:
+                description, = cached
+            self._description = description
         return self._description.strip("\n")
 
     @property
@@ -125,87 +206,103 @@ class Sysctl:
             yield current
             current = current.next
 
+    @staticmethod
+    def decode_value(raw_value: freebsd_sysctl.types.CtlType) -> typing.Any:
+        value = raw_value.value
+        if type(value) == str:
+            return value.strip("\n")
+        return value
+
+    @staticmethod
+    def read_many(
+        names_or_oids: typing.Iterable[NameOrOid]
+    ) -> typing.Dict[BatchKey, typing.Any]:
+        """Return the values of many sysctls keyed by their name or OID."""
+        return SysctlBatch(names_or_oids).read()
+
+    @staticmethod
+    def set_many(
+        values: typing.Mapping[BatchKey, typing.Any]
+    ) -> typing.Dict[BatchKey, int]:
+        """Write many sysctls and return the errno of each write.
+
+        All values are encoded and validated before the first write.
+        Successful writes report 0.
+        """
+        results: typing.Dict[BatchKey, int] = {}
+        updates = []
+        for name_or_oid, value in values.items():
+            key, sysctl = _resolve(name_or_oid)
+            try:
+                updates.append((key, sysctl.oid, sysctl.encode_value(value)))
+                results[key] = 0
+            except OSError as e:
+                results[key] = e.errno
+            except (TypeError, ValueError):
+                results[key] = errno.EINVAL
+        for key, oid, data in updates:
+            results[key] = Sysctl.write_value(oid, data)
+        return results
+
     def __query_kind_and_fmt(self) -> None:
-        self._kind, self._fmt = self.query_fmt(self.oid)
+        cached = freebsd_sysctl.cache.mib_cache.get(self.oid, "kind", "fmt")
+        if cached is None:
+            kind, fmt = self.query_fmt(self.oid)
+            freebsd_sysctl.cache.mib_cache.update(self.oid, kind=kind, fmt=fmt)
+        else:
+            kind, fmt = cached
+        self._kind, self._fmt = kind, fmt
 
     @staticmethod
     def name2oid(name: str) -> typing.List[int]:
-        p_name = ctypes.c_char_p(name.encode() + NULL_BYTES)
-        oid = T_OID(0, 3)
-        p_oid = ctypes.POINTER(T_OID)(oid)
-
-        length = ctypes.c_int(CTL_MAXNAME.value * ctypes.sizeof(ctypes.c_int))
-        p_length = ctypes.POINTER(ctypes.c_int)(length)
-
-        Res = ctypes.c_int*length.value
-        res = (Res)()
-
-        freebsd_sysctl.libc.dll.sysctl(
-            p_oid,
-            2,
-            ctypes.POINTER(Res)(res),
-            p_length,
-            p_name,
-            len(p_name.value)
+        pool = freebsd_sysctl.buffers.pool
+        p_name = name.encode()
+
+        if hasattr(freebsd_sysctl.libc.dll, "sysctlnametomib") is True:
+            oid = pool.oid_buffer()
+            pool.length.value = CTL_MAXNAME.value
+            freebsd_sysctl.libc.check(
+                freebsd_sysctl.libc.dll.sysctlnametomib(
+                    p_name,
+                    oid,
+                    pool.p_length
+                ),
+                name
+            )
+            return oid[:pool.length.value]
+
+        qoid_len = pool.query_oid([0, 3], [])
+        freebsd_sysctl.libc.check(
+            freebsd_sysctl.libc.dll.sysctl(
+                pool.qoid,
+                qoid_len,
+                pool.oid_buffer(),
+                pool.p_length,
+                p_name,
+                len(p_name)
+            ),
+            name
         )
 
-        oid_length = int(length.value / ctypes.sizeof(ctypes.c_int))
-        return res[:oid_length]
+        return pool.oids()
 
     @staticmethod
     def oid2name(oid: typing.List[int]) -> str:
-        qoid_len = (2 + len(oid))
-        qoid_type = ctypes.c_int * qoid_len
-        qoid = (qoid_type)(*([0, 1] + oid))
-        p_qoid = ctypes.POINTER(qoid_type)(qoid)
-
-        buf = ctypes.create_string_buffer(BUFSIZ)
-        buf_void = ctypes.cast(buf, ctypes.c_void_p)
-
-        buf_length = ctypes.sizeof(buf)
-        p_buf_length = ctypes.POINTER(ctypes.c_int)(ctypes.c_int(buf_length))
-
-        freebsd_sysctl.libc.dll.sysctl(
-            p_qoid,
-            qoid_len,
-            buf_void,
-            p_buf_length,
-            0,
-            0
-        )
-        return buf.value.decode()
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([0, 1], oid)
+        Sysctl.__query_buffer(qoid_len, oid)
+        return pool.string()
 
     @staticmethod
     def query_fmt(oid: typing.List[int]) -> typing.Tuple[int, str]:
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([0, 4], oid)
+        buf = Sysctl.__query_buffer(qoid_len, oid)
 
-        qoid_len = (2 + len(oid))
-        qoid_type = ctypes.c_int * qoid_len
-        qoid = (qoid_type)(*([0, 4] + oid))
-        p_qoid = ctypes.POINTER(qoid_type)(qoid)
-
-        buf_type = ctypes.c_char * BUFSIZ
-        buf = buf_type()
-        p_buf = ctypes.POINTER(buf_type)(buf)
-        buf_void = ctypes.cast(p_buf, ctypes.c_void_p)
-
-        buf_length = ctypes.sizeof(buf)
-        p_buf_length = ctypes.POINTER(ctypes.c_int)(ctypes.c_int(buf_length))
-
-        freebsd_sysctl.libc.dll.sysctl(
-            p_qoid,
-            qoid_len,
-            buf_void,
-            p_buf_length,
-            0,
-            0
-        )
-
-        if len(buf) < 4:
+        if pool.length.value < 4:
             raise Exception("response buffer too small")
-        result = buf[:buf_length]
-        kind, = struct.unpack("I", result[:4])
-        null_pos = result.find(b'\x00',4) # buf is large and string is small
-        fmt = result[4:null_pos].decode()
+        kind, = struct.unpack_from("I", buf)
+        fmt = buf[4:pool.length.value].split(NULL_BYTES, 1)[0].decode()
         return (kind, fmt)
 
     @staticmethod
@@ -213,23 +310,23 @@ class Sysctl:
         oid: typing.List[int],
         ctl_type: freebsd_sysctl.types.CtlType
     ) -> bytes:
-
-        oid_type = ctypes.c_int * len(oid)
-        _oid = (oid_type)(*oid)
-        p_oid = ctypes.POINTER(oid_type)(_oid)
-
-        length = ctypes.c_int()
-        p_length = ctypes.POINTER(ctypes.c_int)(length)
-
-        freebsd_sysctl.libc.dll.sysctl(
-            p_oid,
-            len(oid),
-            None,
-            p_length,
-            0
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([], oid)
+        pool.length.value = 0
+
+        freebsd_sysctl.libc.check(
+            freebsd_sysctl.libc.dll.sysctl(
+                pool.qoid,
+                qoid_len,
+                None,
+                pool.p_length,
+                None,
+                0
+            ),
+            oid
         )
 
-        return max(length.value, ctl_type.min_size)
+        return max(pool.length.value, ctl_type.min_size)
 
     @staticmethod
     def query_value(
@@ -238,93 +335,202 @@ class Sysctl:
         ctl_type: freebsd_sysctl.types.CtlType
     ) -> bytes:
 
-        # ToDo: check if value is readable
+        pool = freebsd_sysctl.buffers.pool
+        while True:
+            qoid_len = pool.query_oid([], oid)
+            buf = pool.buffer(size)
+            result = freebsd_sysctl.libc.dll.sysctl(
+                pool.qoid,
+                qoid_len,
+                buf,
+                pool.p_length,
+                None,
+                0
+            )
+            if result == 0:
+                break
+            error = ctypes.get_errno()
+            if error != errno.ENOMEM:
+                raise SysctlError(error, oid)
+            # the value grew since its size was queried
+            size = max(Sysctl.query_size(oid, ctl_type), 2 * size)
+
+        return ctl_type((ctypes.c_char * size).from_buffer_copy(buf), size)
 
-        oid_type = ctypes.c_int * len(oid)
-        _oid = (oid_type)(*oid)
-        p_oid = ctypes.POINTER(oid_type)(_oid)
+    @staticmethod
+    def read_value(
+        oid: typing.List[int],
+        ctl_type: freebsd_sysctl.types.CtlType
+    ) -> freebsd_sysctl.types.CtlType:
+        """Read a value without a preceding size probe.
+
+        The pooled buffer is sized from the last observed size of the OID,
+        with headroom for growing tables. Only when the kernel reports ENOMEM
+        the size is probed and the read repeated.
+        """
+        buf, length = Sysctl.__read_pooled(oid, ctl_type)
+        size = max(length, ctl_type.min_size)
+        data = (ctypes.c_char * size)()
+        ctypes.memmove(data, buf, length)
+        return ctl_type(data, size)
 
-        buf_type = ctypes.c_char * size
-        buf = buf_type()
-        p_buf = ctypes.POINTER(buf_type)(buf)
-        p_buf_void = ctypes.cast(p_buf, ctypes.c_void_p)
+    @staticmethod
+    def read_raw(
+        oid: typing.List[int],
+        ctl_type: freebsd_sysctl.types.CtlType
+    ) -> bytes:
+        """Read the raw bytes of a value like read_value() without decoding."""
+        buf, length = Sysctl.__read_pooled(oid, ctl_type)
+        data = buf[:length]
+        if length < ctl_type.min_size:
+            data += bytes(ctl_type.min_size - length)
+        return data
 
-        buf_length = ctypes.sizeof(buf)
-        p_buf_length = ctypes.POINTER(ctypes.c_int)(ctypes.c_int(buf_length))
+    @staticmethod
+    def __read_pooled(
+        oid: typing.List[int],
+        ctl_type: freebsd_sysctl.types.CtlType
+    ) -> typing.Tuple[ctypes.Array, int]:
+        pool = freebsd_sysctl.buffers.pool
+        hints = freebsd_sysctl.cache.size_hints
+        hint = hints.get(oid)
+        capacity = BUFSIZ if (hint is None) else (hint + hint // SIZE_HEADROOM)
+        probed = False
+        while True:
+            qoid_len = pool.query_oid([], oid)
+            buf = pool.buffer(capacity)
+            pool.length.value = len(buf)
+            result = freebsd_sysctl.libc.dll.sysctl(
+                pool.qoid,
+                qoid_len,
+                buf,
+                pool.p_length,
+                None,
+                0
+            )
+            if result == 0:
+                break
+            error = ctypes.get_errno()
+            if error != errno.ENOMEM:
+                raise SysctlError(error, oid)
+            probed = True
+            hints.probes += 1
+            size = Sysctl.query_size(oid, ctl_type)
+            capacity = max(size + size // SIZE_HEADROOM, 2 * len(buf))
+
+        if probed is False:
+            hints.probes_avoided += 1
+        length = pool.length.value
+        hints.update(oid, length)
+        return (buf, length)
 
-        freebsd_sysctl.libc.dll.sysctl(
-            p_oid,
-            ctypes.c_uint32(len(oid)),
-            p_buf_void,
-            p_buf_length,
+    @staticmethod
+    def query_into(
+        oid: typing.List[int],
+        buffer: WritableBuffer
+    ) -> typing.Tuple[int, int]:
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([], oid)
+        size = memoryview(buffer).nbytes
+        buf = (ctypes.c_char * size).from_buffer(buffer)
+        pool.length.value = size
+
+        result = freebsd_sysctl.libc.dll.sysctl(
+            pool.qoid,
+            qoid_len,
+            buf,
+            pool.p_length,
             None,
             0
         )
 
-        return ctl_type(buf, size)
+        del buf  # release the buffer export, so that it can be resized
+        return (result, pool.length.value)
 
     @staticmethod
-    def query_description(
-        oid: typing.List[int]
-    ) -> str:
+    def write_value(oid: typing.List[int], data: bytes) -> int:
+        """Set the raw value of an OID and return the errno (0 on success)."""
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([], oid)
 
-        qoid_len = (2 + len(oid))
-        qoid_type = ctypes.c_int * qoid_len
-        qoid = (qoid_type)(*([0, 5] + oid))
-        p_qoid = ctypes.POINTER(qoid_type)(qoid)
-
-        buf_type = ctypes.c_char * BUFSIZ
-        buf = buf_type()
-        p_buf = ctypes.POINTER(buf_type)(buf)
-        buf_void = ctypes.cast(p_buf, ctypes.c_void_p)
-
-        buf_length = ctypes.sizeof(buf)
-        p_buf_length = ctypes.POINTER(ctypes.c_int)(ctypes.c_int(buf_length))
-
-        freebsd_sysctl.libc.dll.sysctl(
-            p_qoid,
+        result = freebsd_sysctl.libc.dll.sysctl(
+            pool.qoid,
             qoid_len,
-            buf_void,
-            p_buf_length,
-            0,
-            0
+            None,
+            None,
+            data,
+            len(data)
         )
 
-        return buf.value.decode()
+        return 0 if (result == 0) else ctypes.get_errno()
 
     @staticmethod
-    def query_next(oid: typing.List[int]) -> bytes:
-
-        qoid_len = (2 + len(oid))
-        qoid_type = ctypes.c_int * qoid_len
-        qoid = (qoid_type)(*([0, 2] + oid))
-        p_qoid = ctypes.POINTER(qoid_type)(qoid)
-
-        buf_type = ctypes.c_int * CTL_MAXNAME.value
-        buf = buf_type()
-        p_buf = ctypes.POINTER(buf_type)(buf)
-        buf_void = ctypes.cast(p_buf, ctypes.c_void_p)
+    def query_description(
+        oid: typing.List[int]
+    ) -> str:
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([0, 5], oid)
+        try:
+            Sysctl.__query_buffer(qoid_len, oid)
+        except SysctlError as e:
+            if e.errno == errno.ENOENT:
+                return ""  # not described, like sysctl -d prints nothing
+            raise
+        return pool.string()
 
-        buf_length = ctypes.sizeof(buf)
-        p_buf_length = ctypes.POINTER(ctypes.c_int)(ctypes.c_int(buf_length))
+    @staticmethod
+    def query_next(oid: typing.List[int]) -> bytes:
+        pool = freebsd_sysctl.buffers.pool
+        qoid_len = pool.query_oid([0, 2], oid)
 
-        freebsd_sysctl.libc.dll.sysctl(
-            p_qoid,
+        result = freebsd_sysctl.libc.dll.sysctl(
+            pool.qoid,
             qoid_len,
-            buf_void,
-            p_buf_length,
+            pool.oid_buffer(),
+            pool.p_length,
             0,
             0
         )
 
-        oid_length = int(
-            p_buf_length.contents.value / ctypes.sizeof(ctypes.c_int)
-        )
-        return buf[0:oid_length]
+        if result != 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                return []  # no next OID
+            raise SysctlError(error, oid)
+        return pool.oids()
+
+    @staticmethod
+    def __query_buffer(qoid_len: int, oid: typing.List[int]) -> ctypes.Array:
+        """Query the pool's qoid into its buffer, growing it on ENOMEM."""
+        pool = freebsd_sysctl.buffers.pool
+        buf = pool.buffer()
+        while True:
+            pool.length.value = len(buf)
+            result = freebsd_sysctl.libc.dll.sysctl(
+                pool.qoid,
+                qoid_len,
+                buf,
+                pool.p_length,
+                None,
+                0
+            )
+            if result == 0:
+                return buf
+            error = ctypes.get_errno()
+            if error != errno.ENOMEM:
+                raise SysctlError(error, oid)
+            buf = pool.buffer(2 * len(buf))
 
     @property
     def ctl_type(self) -> freebsd_sysctl.types.CtlType:
-        return self.get_ctl_type(self.kind, self.fmt)
+        if self._ctl_type is None:
+            self._ctl_type = self.get_ctl_type(self.kind, self.fmt)
+        return self._ctl_type
+
+    @property
+    def flags(self) -> int:
+        """Return the flags of the sysctl, like Flags.RD | Flags.TUN."""
+        return freebsd_sysctl.flags.decode(self.kind)
 
     @staticmethod
     def get_ctl_type(
@@ -336,3 +542,283 @@ class Sysctl:
     def has_flag(self, flag: int) -> bool:
         """Return is the sysctl has a certain flag."""
         return (self.kind & flag == flag) is True
+
+
+def _resolve(
+    name_or_oid: typing.Union[NameOrOid, BatchKey]
+) -> typing.Tuple[BatchKey, Sysctl]:
+    if isinstance(name_or_oid, str):
+        return (name_or_oid, Sysctl(name=name_or_oid))
+    oid = list(name_or_oid)
+    return (tuple(oid), Sysctl(oid=oid))
+
+
+class _BatchEntry:
+
+    __slots__ = (
+        "key",
+        "oid",
+        "ctl_type",
+        "size",
+        "c_oid",
+        "c_oid_len",
+        "buf",
+        "buf_length",
+        "p_buf_length"
+    )
+
+    key: BatchKey
+    oid: typing.List[int]
+    ctl_type: typing.Type[freebsd_sysctl.types.CtlType]
+    size: int
+
+    def __init__(self, key: BatchKey, sysctl: Sysctl) -> None:
+        self.key = key
+        self.oid = sysctl.oid
+        self.ctl_type = sysctl.ctl_type
+        hint = freebsd_sysctl.cache.size_hints.get(self.oid)
+        self.size = sysctl.size if (hint is None) else max(hint, 1)
+
+        oid_type = ctypes.c_int * len(self.oid)
+        self.c_oid = (oid_type)(*self.oid)
+        self.c_oid_len = ctypes.c_uint32(len(self.oid))
+        self.buf = (ctypes.c_char * self.size)()
+        self.buf_length = ctypes.c_size_t(self.size)
+        self.p_buf_length = ctypes.pointer(self.buf_length)
+
+    def grow(self) -> None:
+        """Enlarge the buffer after the kernel reported ENOMEM."""
+        size = Sysctl.query_size(self.oid, self.ctl_type)
+        self.size = max(size, 2 * self.size)
+        self.buf = (ctypes.c_char * self.size)()
+
+
+class SysctlBatch:
+    """Repeatedly read a fixed set of sysctls.
+
+    OID, type and size of every entry are resolved on the first read and
+    the ctypes buffers are kept, so that later reads only query the values.
+    """
+
+    _requested: typing.List[NameOrOid]
+    _entries: typing.Optional[typing.List[_BatchEntry]]
+
+    def __init__(self, names_or_oids: typing.Iterable[NameOrOid]) -> None:
+        self._requested = list(names_or_oids)
+        self._entries = None
+
+    @property
+    def entries(self) -> typing.List[_BatchEntry]:
+        if self._entries is None:
+            self._entries = [
+                _BatchEntry(*_resolve(x)) for x in self._requested
+            ]
+        return self._entries
+
+    def read(self) -> typing.Dict[BatchKey, typing.Any]:
+        values = {}
+        for entry in self.entries:
+            while True:
+                entry.buf_length.value = entry.size
+                result = freebsd_sysctl.libc.dll.sysctl(
+                    entry.c_oid,
+                    entry.c_oid_len,
+                    entry.buf,
+                    entry.p_buf_length,
+                    None,
+                    0
+                )
+                if result == 0:
+                    break
+                error = ctypes.get_errno()
+                if error != errno.ENOMEM:
+                    raise SysctlError(error, entry.key)
+                entry.grow()
+            size = max(entry.buf_length.value, entry.ctl_type.min_size)
+            raw_value = entry.ctl_type(entry.buf, size)
+            values[entry.key] = Sysctl.decode_value(raw_value)
+        return values
+
+
+class SysctlRecord(typing.NamedTuple):
+    """Lightweight result of a tree walk."""
+
+    name: str
+    oid: typing.List[int]
+    kind: int
+    fmt: str
+    ctl_type: typing.Type[freebsd_sysctl.types.CtlType]
+    value: typing.Any = None
+    description: typing.Optional[str] = None
+
+    def has_flag(self, flag: int) -> bool:
+        """Return is the sysctl has a certain flag."""
+        return (self.kind & flag == flag) is True
+
+    @property
+    def flags(self) -> int:
+        return freebsd_sysctl.flags.decode(self.kind)
+
+
+def walk(
+    prefix: str="",
+    include_values: bool=True,
+    include_descriptions: bool=False,
+    raw_values: bool=False,
+    include_opaque: bool=True
+) -> typing.Iterator[SysctlRecord]:
+    """Iterate all sysctls below a prefix, or the entire tree.
+
+    One record is queried at a time, without constructing Sysctl objects.
+    Sysctls flagged to be skipped when listing are omitted. With raw_values
+    the values are the undecoded bytes returned by the kernel. Opaque values
+    without a decoder are not read when include_opaque is False.
+    """
+    for record in _walk_metadata(prefix):
+        yield _complete_record(
+            record,
+            include_values,
+            include_descriptions,
+            raw_values,
+            include_opaque
+        )
+
+
+def dump(
+    prefixes: typing.Iterable[str]=("",),
+    workers: int=4,
+    include_values: bool=True,
+    include_descriptions: bool=False
+) -> typing.Iterator[SysctlRecord]:
+    """Iterate all sysctls below several prefixes like walk().
+
+    OIDs are enumerated in one thread, while values and descriptions are
+    read on a pool of worker threads. Records are yielded in tree order.
+    """
+    import concurrent.futures
+    import queue
+    import threading
+
+    pending: queue.Queue = queue.Queue(maxsize=workers * DUMP_QUEUE_DEPTH)
+    stop = threading.Event()
+
+    def enumerate_oids() -> None:
+        try:
+            for prefix in prefixes:
+                for record in _walk_metadata(prefix):
+                    if stop.is_set() is True:
+                        return
+                    pending.put(executor.submit(
+                        _complete_record,
+                        record,
+                        include_values,
+                        include_descriptions
+                    ))
+        except Exception as e:
+            pending.put(e)
+        finally:
+            pending.put(None)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        enumerator = threading.Thread(target=enumerate_oids, daemon=True)
+        enumerator.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception) is True:
+                    raise item
+                yield item.result()
+        finally:
+            stop.set()
+            while enumerator.is_alive() is True:
+                try:
+                    item = pending.get(timeout=0.01)
+                    if isinstance(item, concurrent.futures.Future) is True:
+                        item.cancel()
+                except queue.Empty:
+                    pass
+
+
+def _walk_metadata(prefix: str) -> typing.Iterator[SysctlRecord]:
+    root: typing.List[int] = []
+    if prefix != "":
+        root = Sysctl(prefix).oid
+        record = _metadata_record(root)
+        if record.ctl_type != freebsd_sysctl.types.NODE:
+            yield record
+            return
+
+    oid = root
+    while True:
+        oid = Sysctl.query_next(oid)
+        if (len(oid) == 0) or (oid[:len(root)] != root):
+            return
+        record = _metadata_record(oid)
+        if record.has_flag(freebsd_sysctl.flags.SKIP) is True:
+            continue
+        yield record
+
+
+def _metadata_record(oid: typing.List[int]) -> SysctlRecord:
+    cache = freebsd_sysctl.cache.mib_cache
+    cached = cache.get(oid, "name", "kind", "fmt")
+    if cached is None:
+        name = Sysctl.oid2name(oid)
+        kind, fmt = Sysctl.query_fmt(oid)
+        cache.update(oid, name=name, kind=kind, fmt=fmt)
+    else:
+        name, kind, fmt = cached
+    ctl_type = freebsd_sysctl.types.identify_type(kind, fmt)
+    return SysctlRecord(
+        name=name,
+        oid=oid,
+        kind=kind,
+        fmt=fmt,
+        ctl_type=ctl_type
+    )
+
+
+def _complete_record(
+    record: SysctlRecord,
+    include_values: bool,
+    include_descriptions: bool,
+    raw_values: bool=False,
+    include_opaque: bool=True
+) -> SysctlRecord:
+    oid = record.oid
+    value = None
+    ctl_type = record.ctl_type
+    is_node = (ctl_type == freebsd_sysctl.types.NODE)
+    if (include_opaque is False) and (ctl_type is freebsd_sysctl.types.OPAQUE):
+        include_values = False  # only structs have a decoder
+    if (include_values is True) and (is_node is False):
+        try:
+            if raw_values is True:
+                value = Sysctl.read_raw(oid, record.ctl_type)
+            else:
+                raw_value = Sysctl.read_value(oid, record.ctl_type)
+                if record.ctl_type is freebsd_sysctl.types.OPAQUE:
+                    # raw bytes, not cut at the first NUL like c_char.value
+                    value = bytes(raw_value.as_memoryview())
+                else:
+                    value = Sysctl.decode_value(raw_value)
+        except SysctlError:
+            pass  # not readable, like sysctl -a skips it
+
+    description = None
+    if include_descriptions is True:
+        cache = freebsd_sysctl.cache.mib_cache
+        cached = cache.get(oid, "description")
+        if cached is None:
+            description = Sysctl.query_description(oid)
+            cache.update(oid, kind=record.kind, description=description)
+        else:
+            description, = cached
+        description = description.strip("\n")
+
+    if (value is None) and (description is None):
+        return record
+    return record._replace(value=value, description=description)
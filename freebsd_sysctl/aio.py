@@ -0,0 +1,139 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""asyncio interface running the blocking sysctl calls on a thread pool.
+
+ctypes releases the GIL during foreign calls, so that several sysctls can
+be queried in parallel without blocking the event loop.
+"""
+import asyncio
+import concurrent.futures
+import typing
+
+import freebsd_sysctl
+
+MAX_WORKERS = 4
+WALK_CHUNK_SIZE = 64
+
+_executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+_pending: typing.Dict[typing.Tuple[typing.Any, ...], asyncio.Future] = {}
+
+
+def executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the bounded thread pool shared by all requests."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_WORKERS,
+            thread_name_prefix="freebsd_sysctl"
+        )
+    return _executor
+
+
+def _key(name_or_oid: freebsd_sysctl.NameOrOid) -> freebsd_sysctl.BatchKey:
+    if isinstance(name_or_oid, str):
+        return name_or_oid
+    return tuple(name_or_oid)
+
+
+async def _coalesced(
+    key: typing.Tuple[typing.Any, ...],
+    function: typing.Callable[..., typing.Any],
+    *args: typing.Any
+) -> typing.Any:
+    """Run a function on the pool, sharing the call with identical requests.
+
+    Cancelling a request does not cancel the call for the other requests
+    waiting on it. A call that already runs in a thread can not be
+    interrupted, its result is discarded when nobody waits for it.
+    """
+    loop = asyncio.get_event_loop()
+    key = (loop,) + key
+    future = _pending.get(key)
+    if future is None:
+        future = loop.run_in_executor(executor(), function, *args)
+        _pending[key] = future
+
+        def forget(done: asyncio.Future) -> None:
+            if _pending.get(key) is done:
+                del _pending[key]
+            if done.cancelled() is False:
+                done.exception()  # retrieved, when no request waits anymore
+
+        future.add_done_callback(forget)
+    return await asyncio.shield(future)
+
+
+def _read(name_or_oid: freebsd_sysctl.NameOrOid) -> typing.Any:
+    if isinstance(name_or_oid, str):
+        return freebsd_sysctl.Sysctl(name=name_or_oid).value
+    return freebsd_sysctl.Sysctl(oid=list(name_or_oid)).value
+
+
+async def read(name_or_oid: freebsd_sysctl.NameOrOid) -> typing.Any:
+    """Return the value of a sysctl by name or OID."""
+    return await _coalesced(("read", _key(name_or_oid)), _read, name_or_oid)
+
+
+async def read_many(
+    names_or_oids: typing.Iterable[freebsd_sysctl.NameOrOid]
+) -> typing.Dict[freebsd_sysctl.BatchKey, typing.Any]:
+    """Return the values of several sysctls keyed like Sysctl.read_many()."""
+    names_or_oids = list(names_or_oids)
+    keys = tuple(_key(x) for x in names_or_oids)
+    return await _coalesced(
+        ("read_many", keys),
+        freebsd_sysctl.Sysctl.read_many,
+        names_or_oids
+    )
+
+
+def _next_records(
+    records: typing.Iterator[freebsd_sysctl.SysctlRecord]
+) -> typing.List[freebsd_sysctl.SysctlRecord]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == WALK_CHUNK_SIZE:
+            break
+    return chunk
+
+
+async def walk(
+    prefix: str="",
+    include_values: bool=True,
+    include_descriptions: bool=False
+) -> typing.AsyncIterator[freebsd_sysctl.SysctlRecord]:
+    """Iterate all sysctls below a prefix like freebsd_sysctl.walk().
+
+    Records are queried in chunks on the thread pool. Cancelling the
+    iteration stops the walk after the chunk in progress.
+    """
+    loop = asyncio.get_event_loop()
+    records = freebsd_sysctl.walk(prefix, include_values, include_descriptions)
+    while True:
+        chunk = await loop.run_in_executor(executor(), _next_records, records)
+        for record in chunk:
+            yield record
+        if len(chunk) < WALK_CHUNK_SIZE:
+            return
@@ -0,0 +1,82 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Per-thread ctypes buffers reused by the sysctl queries."""
+import ctypes
+import threading
+import typing
+
+CTL_MAXNAME = 24
+BUFSIZ = 1024 # see /include/stdio.h#L209
+
+
+class BufferPool(threading.local):
+    """Grow-only ctypes buffers, private to the current thread.
+
+    The contents are only valid until the next query on the same thread.
+    """
+
+    allocations: int
+
+    def __init__(self) -> None:
+        self.allocations = 0
+        self.qoid = (ctypes.c_int * (2 + CTL_MAXNAME))()
+        self.oid = (ctypes.c_int * CTL_MAXNAME)()
+        self.length = ctypes.c_size_t()
+        self.p_length = ctypes.pointer(self.length)
+        self._buffer = (ctypes.c_char * BUFSIZ)()
+
+    def query_oid(
+        self,
+        prefix: typing.Sequence[int],
+        oid: typing.Sequence[int]
+    ) -> int:
+        """Write a MIB into the qoid buffer and return its length."""
+        offset = len(prefix)
+        qoid_len = offset + len(oid)
+        self.qoid[0:offset] = prefix
+        self.qoid[offset:qoid_len] = oid
+        return qoid_len
+
+    def buffer(self, size: int=BUFSIZ) -> ctypes.Array:
+        if len(self._buffer) < size:
+            self._buffer = (ctypes.c_char * size)()
+            self.allocations += 1
+        self.length.value = size
+        return self._buffer
+
+    def string(self) -> str:
+        """Decode the NUL terminated string returned into the buffer."""
+        data = self._buffer[:self.length.value]
+        return data.split(b"\x00", 1)[0].decode()
+
+    def oid_buffer(self) -> ctypes.Array:
+        ctypes.memset(self.oid, 0, ctypes.sizeof(self.oid))
+        self.length.value = ctypes.sizeof(self.oid)
+        return self.oid
+
+    def oids(self) -> typing.List[int]:
+        return self.oid[:self.length.value // ctypes.sizeof(ctypes.c_int)]
+
+
+pool = BufferPool()
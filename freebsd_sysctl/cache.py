@@ -0,0 +1,265 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Process-wide cache of static sysctl metadata."""
+import collections
+import os
+import threading
+import typing
+
+import freebsd_sysctl.flags
+
+OidKey = typing.Tuple[int, ...]
+NameOrOid = typing.Union[str, typing.Sequence[int]]
+DEFAULT_MAXSIZE: typing.Optional[int] = None  # a MIB has a bounded size
+
+UNCACHEABLE_FLAGS = freebsd_sysctl.flags.DYN | freebsd_sysctl.flags.DYING
+
+
+def cache_directory() -> str:
+    """Return the directory of files cached across processes."""
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME",
+        os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "freebsd_sysctl")
+
+
+class MibEntry:
+
+    __slots__ = ("name", "kind", "fmt", "description")
+
+    name: typing.Optional[str]
+    kind: typing.Optional[int]
+    fmt: typing.Optional[str]
+    description: typing.Optional[str]
+
+    def __init__(self) -> None:
+        self.name = None
+        self.kind = None
+        self.fmt = None
+        self.description = None
+
+
+class MibCache:
+    """LRU cache of name, OID, kind, fmt and description.
+
+    The metadata of a sysctl does not change for the life of the kernel,
+    except for dynamic OIDs, which are never kept in the cache. The cache
+    holds the entire MIB unless a maxsize is given, because a walk of a
+    tree larger than the cache would evict every entry before its reuse.
+    """
+
+    maxsize: typing.Optional[int]
+    hits: int
+    misses: int
+    index_hits: int
+    index: typing.Optional[typing.Any]
+
+    def __init__(
+        self,
+        maxsize: typing.Optional[int]=DEFAULT_MAXSIZE
+    ) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.index_hits = 0
+        self.index = None
+        self._entries: typing.MutableMapping[OidKey, MibEntry]
+        self._entries = collections.OrderedDict()
+        self._oids: typing.Dict[str, OidKey] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def oid(self, name: str) -> typing.Optional[typing.List[int]]:
+        with self._lock:
+            oid = self._oids.get(name)
+            if oid is not None:
+                self._entries.move_to_end(oid)  # type: ignore
+                self.hits += 1
+                return list(oid)
+        oid = self.__load_from_index(name)
+        if oid is None:
+            self.misses += 1
+            return None
+        return list(oid)
+
+    def get(
+        self,
+        oid: typing.Sequence[int],
+        *attributes: str
+    ) -> typing.Optional[typing.Tuple[typing.Any, ...]]:
+        """Return the cached attributes of an OID or None if any is missing."""
+        key = tuple(oid)
+        values = self.__get(key, attributes)
+        if values is not None:
+            return values
+        if self.__load_from_index(key) is not None:
+            values = self.__get(key, attributes)
+        if values is None:
+            self.misses += 1
+        return values
+
+    def __get(
+        self,
+        key: OidKey,
+        attributes: typing.Tuple[str, ...]
+    ) -> typing.Optional[typing.Tuple[typing.Any, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            values = tuple(getattr(entry, x) for x in attributes)
+            if None in values:
+                return None
+            self._entries.move_to_end(key)  # type: ignore
+            self.hits += 1
+            return values
+
+    def __load_from_index(
+        self,
+        name_or_oid: typing.Union[str, OidKey]
+    ) -> typing.Optional[OidKey]:
+        """Copy an entry of the persistent index into the cache."""
+        if self.index is None:
+            return None
+        found = self.index.lookup(name_or_oid)
+        if found is None:
+            return None
+        self.update(
+            found.oid,
+            name=found.name,
+            kind=found.kind,
+            fmt=found.fmt,
+            description=found.description
+        )
+        self.index_hits += 1
+        return tuple(found.oid)
+
+    def update(
+        self,
+        oid: typing.Sequence[int],
+        **attributes: typing.Any
+    ) -> None:
+        """Remember metadata of an OID unless it is dynamic."""
+        key = tuple(oid)
+        kind = attributes.get("kind")
+        if (kind is not None) and (kind & UNCACHEABLE_FLAGS) != 0:
+            self.invalidate(key)
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = MibEntry()
+            for attribute, value in attributes.items():
+                setattr(entry, attribute, value)
+            if (entry.name is not None) and (entry.kind is not None):
+                # names resolve to the OID once it is known not to be dynamic
+                self._oids[entry.name] = key
+            self._entries.move_to_end(key)  # type: ignore
+            while self.__is_full() is True:
+                evicted = self._entries.popitem(last=False)  # type: ignore
+                self.__forget_name(*evicted)
+
+    def invalidate(
+        self,
+        name_or_oid: typing.Optional[NameOrOid]=None
+    ) -> None:
+        """Drop one entry by name or OID, or the entire cache."""
+        with self._lock:
+            if name_or_oid is None:
+                self._entries.clear()
+                self._oids.clear()
+                return
+            if isinstance(name_or_oid, str):
+                key = self._oids.pop(name_or_oid, None)
+                if key is None:
+                    return
+            else:
+                key = tuple(name_or_oid)
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.__forget_name(key, entry)
+
+    def __is_full(self) -> bool:
+        if self.maxsize is None:
+            return False
+        return len(self._entries) > self.maxsize
+
+    def __forget_name(self, key: OidKey, entry: MibEntry) -> None:
+        if (entry.name is not None) and (self._oids.get(entry.name) == key):
+            del self._oids[entry.name]
+
+    def reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.index_hits = 0
+
+
+class SizeHints:
+    """Last observed value size per OID, used to size buffers without probes.
+
+    Counts the size probes that were issued and those that could be avoided.
+    """
+
+    maxsize: typing.Optional[int]
+    probes: int
+    probes_avoided: int
+
+    def __init__(
+        self,
+        maxsize: typing.Optional[int]=DEFAULT_MAXSIZE
+    ) -> None:
+        self.maxsize = maxsize
+        self.probes = 0
+        self.probes_avoided = 0
+        self._sizes: typing.MutableMapping[OidKey, int]
+        self._sizes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, oid: typing.Sequence[int]) -> typing.Optional[int]:
+        return self._sizes.get(tuple(oid))
+
+    def update(self, oid: typing.Sequence[int], size: int) -> None:
+        key = tuple(oid)
+        with self._lock:
+            self._sizes[key] = size
+            self._sizes.move_to_end(key)  # type: ignore
+            if self.maxsize is None:
+                return
+            while len(self._sizes) > self.maxsize:
+                self._sizes.popitem(last=False)  # type: ignore
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._sizes.clear()
+
+    def reset_counters(self) -> None:
+        self.probes = 0
+        self.probes_avoided = 0
+
+
+mib_cache = MibCache()
+size_hints = SizeHints()
@@ -0,0 +1,219 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Command line interface with output compatible to sysctl(8).
+
+    python -m freebsd_sysctl [-adnot] [--json | --ndjson] [name ...]
+"""
+import argparse
+import json
+import sys
+import time
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.libc
+import freebsd_sysctl.simulated
+import freebsd_sysctl.types
+import freebsd_sysctl.writer
+
+OPAQUE_DUMP_LENGTH = 16
+
+
+def _format_struct(fmt: str, value: typing.Any) -> str:
+    if fmt == "S,loadavg":
+        return "{ " + " ".join(f"{x:.2f}" for x in value.ldavg) + " }"
+    if fmt == "S,clockinfo":
+        return (
+            f"{{ hz = {value.hz}, tick = {value.tick}, "
+            f"profhz = {value.profhz}, stathz = {value.stathz} }}"
+        )
+    if fmt == "S,timeval":
+        return (
+            f"{{ sec = {value.tv_sec}, usec = {value.tv_usec} }} "
+            + time.ctime(value.tv_sec)
+        )
+    if isinstance(value, tuple) is True:
+        return " ".join(str(x) for x in value)
+    return str(value)
+
+
+def _dump_opaque(record: freebsd_sysctl.SysctlRecord) -> typing.Optional[str]:
+    if record.value is None:
+        return None
+    data = bytes(record.value)
+    dump = data[:OPAQUE_DUMP_LENGTH].hex()
+    if len(data) > OPAQUE_DUMP_LENGTH:
+        dump += "..."
+    return f"Format:{record.fmt} Length:{len(data)} Dump:0x{dump}"
+
+
+def format_value(
+    record: freebsd_sysctl.SysctlRecord,
+    opaque: bool=False
+) -> typing.Optional[str]:
+    """Return the value like sysctl(8) prints it, or None to skip it.
+
+    Opaque values without a decoder are only dumped with opaque set.
+    """
+    ctl_type = record.ctl_type
+    if issubclass(ctl_type, freebsd_sysctl.types.STRUCT) is True:
+        if record.value is None:
+            return None
+        return _format_struct(record.fmt, record.value)
+    if issubclass(ctl_type, freebsd_sysctl.types.OPAQUE) is True:
+        return _dump_opaque(record) if (opaque is True) else None
+    if record.value is None:
+        return None
+    if isinstance(record.value, list) is True:
+        return " ".join(str(x) for x in record.value)
+    return str(record.value)
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m freebsd_sysctl",
+        description="Get kernel state like sysctl(8)."
+    )
+    parser.add_argument("names", nargs="*", metavar="name")
+    parser.add_argument(
+        "-a", dest="all", action="store_true",
+        help="list all sysctls, or all below the given names"
+    )
+    parser.add_argument(
+        "-d", dest="descriptions", action="store_true",
+        help="print the descriptions instead of the values"
+    )
+    parser.add_argument(
+        "-n", dest="values_only", action="store_true",
+        help="do not print the names"
+    )
+    parser.add_argument(
+        "-o", dest="opaque", action="store_true",
+        help="dump opaque values"
+    )
+    parser.add_argument(
+        "-t", dest="types", action="store_true",
+        help="print the types instead of the values"
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--json", dest="output", action="store_const", const="json",
+        help="print a JSON list of records"
+    )
+    output.add_argument(
+        "--ndjson", dest="output", action="store_const", const="ndjson",
+        help="print one JSON record per line"
+    )
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="read from a snapshot file instead of the kernel"
+    )
+    return parser
+
+
+def main(
+    argv: typing.Optional[typing.List[str]]=None,
+    stdout: typing.TextIO=sys.stdout,
+    stderr: typing.TextIO=sys.stderr
+) -> int:
+    args = parser().parse_args(argv)
+    if (len(args.names) == 0) and (args.all is False):
+        parser().print_usage(stderr)
+        return 1
+    if args.snapshot is not None:
+        freebsd_sysctl.libc.use(freebsd_sysctl.simulated.load(args.snapshot))
+
+    names = args.names or [""]
+    metadata_only = (args.output is None) and (args.types or args.descriptions)
+    include_values = (metadata_only is False)
+    include_descriptions = (args.descriptions is True)
+
+    exit_code = 0
+    output = _Output(args, stdout)
+    for name in names:
+        records = freebsd_sysctl.walk(
+            name,
+            include_values=include_values,
+            include_descriptions=include_descriptions,
+            include_opaque=(args.opaque is True)
+        )
+        try:
+            for record in records:
+                output.write(record)
+        except freebsd_sysctl.SysctlError:
+            stderr.write(f"sysctl: unknown oid '{name}'\n")
+            exit_code = 1
+    output.close()
+    return exit_code
+
+
+class _Output:
+    """Write records as text like sysctl(8), as JSON list or as NDJSON."""
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        stdout: typing.TextIO
+    ) -> None:
+        self.args = args
+        self.stdout = stdout
+        self.empty = True
+        if args.output == "json":
+            stdout.write("[")
+
+    def write(self, record: freebsd_sysctl.SysctlRecord) -> None:
+        args = self.args
+        if args.output is not None:
+            data = freebsd_sysctl.writer.record_dict(
+                record,
+                args.descriptions,
+                args.opaque
+            )
+            if data is None:
+                return
+            if args.output == "ndjson":
+                self.stdout.write(json.dumps(data) + "\n")
+                return
+            if self.empty is False:
+                self.stdout.write(",\n")
+            self.stdout.write(json.dumps(data))
+            self.empty = False
+            return
+
+        if args.types is True:
+            text: typing.Optional[str] = record.ctl_type.type_name
+        elif args.descriptions is True:
+            text = record.description
+        else:
+            text = format_value(record, opaque=args.opaque)
+        if text is None:
+            return
+        if args.values_only is True:
+            self.stdout.write(f"{text}\n")
+        else:
+            self.stdout.write(f"{record.name}: {text}\n")
+
+    def close(self) -> None:
+        if self.args.output == "json":
+            self.stdout.write("]\n")
@@ -0,0 +1,206 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Prometheus exporter for numeric sysctls.
+
+Metric families are built once from the MIB. A scrape only reads the
+values and inserts them into the pre-rendered exposition text.
+"""
+import argparse
+import fnmatch
+import http.server
+import re
+import socketserver
+import threading
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.flags
+import freebsd_sysctl.types
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_PORT = 9124
+NAMESPACE = "sysctl"
+
+_INVALID_CHARACTERS = re.compile("[^a-zA-Z0-9_]")
+
+# line prefix, batch key and array index of every sample
+Sample = typing.Tuple[str, typing.Tuple[int, ...], typing.Optional[int]]
+
+
+def metric_name(name: str, namespace: str=NAMESPACE) -> str:
+    """Return the metric name of a sysctl, like sysctl_kern_maxvnodes."""
+    return _INVALID_CHARACTERS.sub("_", f"{namespace}_{name}")
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+class Exporter:
+    """Render numeric sysctls below prefixes in Prometheus text format.
+
+    Sysctls flagged with flags.STATS are exported as counters, all others
+    as gauges. Arrays like kern.cp_time have one sample per element with
+    an index label. Only names matching one of the allow patterns are
+    exported, when patterns are given.
+    """
+
+    prefixes: typing.List[str]
+    allow: typing.Optional[typing.List[str]]
+    namespace: str
+    _samples: typing.List[Sample]
+    _batch: typing.Optional[freebsd_sysctl.SysctlBatch]
+
+    def __init__(
+        self,
+        prefixes: typing.Iterable[str]=("",),
+        allow: typing.Optional[typing.Iterable[str]]=None,
+        namespace: str=NAMESPACE
+    ) -> None:
+        self.prefixes = list(prefixes)
+        self.allow = None if (allow is None) else list(allow)
+        self.namespace = namespace
+        self._samples = []
+        self._batch = None
+        self._lock = threading.Lock()
+
+    def is_allowed(self, name: str) -> bool:
+        if self.allow is None:
+            return True
+        return any(fnmatch.fnmatchcase(name, x) for x in self.allow)
+
+    def build(self) -> None:
+        """Build the metric families from the MIB."""
+        samples: typing.List[Sample] = []
+        oids: typing.List[typing.List[int]] = []
+        for prefix in self.prefixes:
+            records = freebsd_sysctl.walk(prefix, include_descriptions=True)
+            for record in records:
+                if record.ctl_type.unpack_format is None:
+                    continue  # strings and opaque structs
+                if record.ctl_type == freebsd_sysctl.types.NODE:
+                    continue
+                if record.value is None:
+                    continue  # not readable
+                if self.is_allowed(record.name) is False:
+                    continue
+                key = tuple(record.oid)
+                oids.append(record.oid)
+                name = metric_name(record.name, self.namespace)
+                if record.has_flag(freebsd_sysctl.flags.STATS) is True:
+                    metric_type = "counter"
+                else:
+                    metric_type = "gauge"
+                family = (
+                    f"# HELP {name} {_escape(record.description or '')}\n"
+                    f"# TYPE {name} {metric_type}\n"
+                )
+                if isinstance(record.value, list) is False:
+                    samples.append((f"{family}{name} ", key, None))
+                    continue
+                for index in range(len(record.value)):
+                    line = f'{name}{{index="{index}"}} '
+                    if index == 0:
+                        line = family + line
+                    samples.append((line, key, index))
+        self._samples = samples
+        self._batch = freebsd_sysctl.SysctlBatch(oids)
+
+    def render(self) -> str:
+        """Read all values and return the exposition text of a scrape."""
+        with self._lock:
+            if self._batch is None:
+                self.build()
+            try:
+                values = self._batch.read()  # type: ignore
+            except freebsd_sysctl.SysctlError:
+                self.build()  # a dynamic sysctl disappeared
+                values = self._batch.read()  # type: ignore
+            lines = []
+            for line, key, index in self._samples:
+                value = values[key]
+                if isinstance(value, list) is False:
+                    value = [value]  # arrays of one element decode as scalar
+                position = 0 if (index is None) else index
+                if position >= len(value):
+                    continue
+                lines.append(f"{line}{value[position]}\n")
+            return "".join(lines)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    exporter: Exporter
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.exporter.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def server(
+    exporter: Exporter,
+    address: typing.Tuple[str, int]=("", DEFAULT_PORT)
+) -> http.server.HTTPServer:
+    """Return an HTTP server publishing the exporter on /metrics."""
+    handler = type("Handler", (_Handler,), dict(exporter=exporter))
+    return _Server(address, handler)
+
+
+def main(argv: typing.Optional[typing.List[str]]=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m freebsd_sysctl.exporter",
+        description="Export numeric sysctls to Prometheus."
+    )
+    parser.add_argument("prefixes", nargs="*", default=[""])
+    parser.add_argument(
+        "--allow",
+        action="append",
+        help="export only sysctls matching this glob pattern"
+    )
+    parser.add_argument("--address", default="")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--namespace", default=NAMESPACE)
+    args = parser.parse_args(argv)
+
+    exporter = Exporter(args.prefixes, args.allow, args.namespace)
+    exporter.build()
+    server(exporter, (args.address, args.port)).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,9 @@
 # IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 """sysctl flags decoded from fmt."""
+import functools
+import typing
+
 RD = 0x80000000                     # Allow reads of variable
 WR = 0x40000000                     # Allow writes to the variable
 RW = (RD | WR)
@@ -31,7 +34,8 @@ SECURE = 0x08000000                 # Permit set only if securelevel<=0
 PRISON = 0x04000000                 # Prisoned roots can fiddle
 DYN = 0x02000000                    # Dynamic oid - can be freed
 SKIP = 0x01000000                   # Skip this sysctl when listing
-SECURE = 0x00F00000                 # Secure level
+SECURE_MASK = 0x00F00000            # Secure level
+SECURE_SHIFT = 20
 TUN = 0x00080000                    # Default value is loaded from getenv()
 RDTUN = (RD | TUN)
 RWTUN = (RW | TUN)
@@ -42,4 +46,60 @@ CAPRD = 0x00008000                  # Can be read in capability mode
 CAPWR = 0x00004000                  # Can be written in capability mode
 STATS = 0x00002000                  # Statistics, not a tuneable
 NOFETCH = 0x00001000                # Don't fetch tunable from getenv()
-CAPRW = (CAPRD | CAPWR)
\ No newline at end of file
+CAPRW = (CAPRD | CAPWR)
+
+# single flags in the order sysctl.h defines them
+NAMES = (
+    ("RD", RD),
+    ("WR", WR),
+    ("DORMANT", DORMANT),
+    ("ANYBODY", ANYBODY),
+    ("SECURE", SECURE),
+    ("PRISON", PRISON),
+    ("DYN", DYN),
+    ("SKIP", SKIP),
+    ("TUN", TUN),
+    ("MPSAFE", MPSAFE),
+    ("VNET", VNET),
+    ("DYING", DYING),
+    ("CAPRD", CAPRD),
+    ("CAPWR", CAPWR),
+    ("STATS", STATS),
+    ("NOFETCH", NOFETCH)
+)
+
+
+MASK = functools.reduce(lambda x, y: x | y, [flag for _, flag in NAMES])
+
+
+@functools.lru_cache(maxsize=None)
+def flag_type() -> type:
+    """Return the enum.IntFlag type Flags, built on the first call."""
+    import enum
+    return enum.IntFlag(  # type: ignore
+        "Flags",
+        list(NAMES) + [
+            ("RW", RW),
+            ("RDTUN", RDTUN),
+            ("RWTUN", RWTUN),
+            ("CAPRW", CAPRW)
+        ],
+        module=__name__
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def decode(kind: int) -> int:
+    """Return the flags set in the kind of a sysctl as Flags."""
+    return flag_type()(kind & MASK)
+
+
+@functools.lru_cache(maxsize=256)
+def names(kind: int) -> typing.Tuple[str, ...]:
+    """Return the names of the flags set in the kind of a sysctl."""
+    return tuple(name for name, flag in NAMES if (kind & flag) == flag)
+
+
+def securelevel(kind: int) -> int:
+    """Return the securelevel above which a SECURE sysctl is read-only."""
+    return (kind & SECURE_MASK) >> SECURE_SHIFT
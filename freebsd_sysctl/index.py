@@ -0,0 +1,334 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Persistent on-disk index of sysctl metadata.
+
+The MIB layout only changes with the kernel or loaded modules, so that
+names, OIDs, kinds, formats and descriptions can be stored across
+processes. The index file is mapped into memory and searched in place.
+It is validated on the first lookup against a fingerprint of the running
+kernel, which is read from OIDs stored in the index itself, so that a
+valid index answers lookups without any metadata syscall.
+"""
+import mmap
+import os
+import struct
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.cache
+import freebsd_sysctl.flags
+import freebsd_sysctl.libc
+import freebsd_sysctl.types
+
+MAGIC = b"FBSDMIB\x01"
+HEADER = struct.Struct("<8sIII")  # magic, key oids, key and entry size
+OFFSET = struct.Struct("<I")
+RECORD = struct.Struct("<IHHH")  # kind, name, fmt and description length
+NO_DESCRIPTION = 0xFFFF
+
+# sysctls that change with the kernel or on reboot
+KEY_NAMES = ("kern.osrevision", "kern.version", "kern.boottime")
+
+
+class IndexEntry(typing.NamedTuple):
+    """Metadata of a sysctl as stored in the index."""
+
+    oid: typing.Tuple[int, ...]
+    name: str
+    kind: int
+    fmt: str
+    description: typing.Optional[str]
+
+
+def default_path() -> str:
+    return os.path.join(freebsd_sysctl.cache.cache_directory(), "mib.index")
+
+
+def module_generation() -> typing.List[int]:
+    """Return the IDs of the loaded kernel linker files.
+
+    IDs are not reused, so that loading or unloading a module changes them.
+    """
+    kldnext = getattr(freebsd_sysctl.libc.dll, "kldnext", None)
+    if kldnext is None:
+        return []
+    file_ids = []
+    file_id = kldnext(0)
+    while file_id > 0:
+        file_ids.append(file_id)
+        file_id = kldnext(file_id)
+    return file_ids
+
+
+def fingerprint(key_oids: typing.Sequence[typing.Sequence[int]]) -> bytes:
+    """Return the raw values of the key sysctls and the module generation.
+
+    The values are read by OID as opaque bytes, without metadata queries.
+    """
+    data = bytearray()
+    for oid in key_oids:
+        raw_value = freebsd_sysctl.Sysctl.read_value(
+            list(oid),
+            freebsd_sysctl.types.OPAQUE
+        )
+        value = bytes(raw_value.data)[:raw_value.size]
+        data += OFFSET.pack(len(value)) + value
+    file_ids = module_generation()
+    data += OFFSET.pack(len(file_ids))
+    data += struct.pack(f"<{len(file_ids)}i", *file_ids)
+    return bytes(data)
+
+
+def _pack_oid(oid: typing.Sequence[int]) -> bytes:
+    return struct.pack(f"<B{len(oid)}i", len(oid), *oid)
+
+
+def _unpack_oid(
+    data: typing.Any,
+    offset: int
+) -> typing.Tuple[typing.Tuple[int, ...], int]:
+    length = data[offset]
+    oid = struct.unpack_from(f"<{length}i", data, offset + 1)
+    return (oid, offset + 1 + 4 * length)
+
+
+def write(
+    path: str,
+    entries: typing.Iterable[IndexEntry],
+    key_oids: typing.Sequence[typing.Sequence[int]]
+) -> None:
+    """Write an index file atomically."""
+    entries = list(entries)
+    records = bytearray()
+    offsets = []
+    for entry in entries:
+        name = entry.name.encode()
+        fmt = entry.fmt.encode()
+        if entry.description is None:
+            description = b""
+            description_length = NO_DESCRIPTION
+        else:
+            description = entry.description.encode()[:NO_DESCRIPTION - 1]
+            description_length = len(description)
+        offsets.append(len(records))
+        records += _pack_oid(entry.oid)
+        records += RECORD.pack(
+            entry.kind,
+            len(name),
+            len(fmt),
+            description_length
+        )
+        records += name + fmt + description
+
+    packed_key_oids = bytes([len(key_oids)])
+    packed_key_oids += b"".join(_pack_oid(oid) for oid in key_oids)
+    key = fingerprint(key_oids)
+    start = HEADER.size + len(packed_key_oids) + len(key)
+    start += 2 * OFFSET.size * len(entries)
+    by_name = sorted(range(len(entries)), key=lambda i: entries[i].name)
+    by_oid = sorted(range(len(entries)), key=lambda i: entries[i].oid)
+
+    data = bytearray(HEADER.pack(
+        MAGIC,
+        len(packed_key_oids),
+        len(key),
+        len(entries)
+    ))
+    data += packed_key_oids + key
+    for order in (by_name, by_oid):
+        for i in order:
+            data += OFFSET.pack(start + offsets[i])
+    data += records
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}"
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+    os.replace(temporary_path, path)
+
+
+def build(path: typing.Optional[str]=None) -> None:
+    """Write an index of all static sysctls of the running kernel."""
+    key_oids = []
+    for name in KEY_NAMES:
+        try:
+            key_oids.append(freebsd_sysctl.Sysctl(name).oid)
+        except freebsd_sysctl.SysctlError:
+            pass  # not available on this kernel
+
+    entries = []
+    oid: typing.List[int] = []
+    while True:
+        oid = freebsd_sysctl.Sysctl.query_next(oid)
+        if len(oid) == 0:
+            break
+        name = freebsd_sysctl.Sysctl.oid2name(oid)
+        kind, fmt = freebsd_sysctl.Sysctl.query_fmt(oid)
+        if (kind & freebsd_sysctl.cache.UNCACHEABLE_FLAGS) != 0:
+            continue
+        try:
+            description: typing.Optional[str]
+            description = freebsd_sysctl.Sysctl.query_description(oid)
+        except freebsd_sysctl.SysctlError:
+            description = None
+        entries.append(IndexEntry(tuple(oid), name, kind, fmt, description))
+
+    write(path or default_path(), entries, key_oids)
+
+
+class MibIndex:
+    """Read-only index file of sysctl metadata, mapped into memory.
+
+    A missing or stale index is rebuilt on first use, when rebuild is True.
+    """
+
+    path: str
+    rebuild: bool
+    size: int
+    _map: typing.Optional[mmap.mmap]
+    _tables: int
+    _valid: typing.Optional[bool]
+
+    def __init__(
+        self,
+        path: typing.Optional[str]=None,
+        rebuild: bool=False
+    ) -> None:
+        self.path = path or default_path()
+        self.rebuild = rebuild
+        self.size = 0
+        self._map = None
+        self._tables = 0
+        self._valid = None
+
+    @property
+    def valid(self) -> bool:
+        """Return whether the index matches the running kernel."""
+        if self._valid is None:
+            self._valid = False  # lookups while building fall through
+            self._valid = self.__open()
+            if (self._valid is False) and (self.rebuild is True):
+                build(self.path)
+                self._valid = self.__open()
+        return self._valid
+
+    def __open(self) -> bool:
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, oids_size, key_size, size = HEADER.unpack_from(data)
+            if magic != MAGIC:
+                raise ValueError("unknown index format")
+            offset = HEADER.size + 1
+            key_oids = []
+            for _ in range(data[HEADER.size]):
+                oid, offset = _unpack_oid(data, offset)
+                key_oids.append(oid)
+            offset = HEADER.size + oids_size
+            if data[offset:offset + key_size] != fingerprint(key_oids):
+                raise ValueError("stale index")
+        except (ValueError, IndexError, struct.error, OSError):
+            data.close()
+            return False
+        self._map = data
+        self.size = size
+        self._tables = offset + key_size
+        return True
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.size = 0
+
+    def entry(self, column: int, position: int) -> IndexEntry:
+        """Return an entry by its position in the name (0) or OID (1) order."""
+        if (position < 0) or (position >= self.size):
+            raise IndexError(position)
+        data = self._map
+        table = self._tables + column * self.size * OFFSET.size
+        offset, = OFFSET.unpack_from(data, table + position * OFFSET.size)
+        oid, offset = _unpack_oid(data, offset)
+        kind, name_size, fmt_size, description_size = RECORD.unpack_from(
+            data,  # type: ignore
+            offset
+        )
+        offset += RECORD.size
+        name = data[offset:offset + name_size].decode()  # type: ignore
+        offset += name_size
+        fmt = data[offset:offset + fmt_size].decode()  # type: ignore
+        offset += fmt_size
+        description = None
+        if description_size != NO_DESCRIPTION:
+            description = data[  # type: ignore
+                offset:offset + description_size
+            ].decode()
+        return IndexEntry(oid, name, kind, fmt, description)
+
+    def lookup(
+        self,
+        name_or_oid: typing.Union[str, typing.Sequence[int]]
+    ) -> typing.Optional[IndexEntry]:
+        """Return the entry of a name or OID, if the index is valid."""
+        if self.valid is False:
+            return None
+        target: typing.Any
+        if isinstance(name_or_oid, str):
+            column, target = (0, name_or_oid)
+        else:
+            column, target = (1, tuple(name_or_oid))
+        low, high = (0, self.size)
+        while low < high:
+            middle = (low + high) // 2
+            entry = self.entry(column, middle)
+            value = entry.oid if column else entry.name
+            if value < target:
+                low = middle + 1
+            elif value > target:
+                high = middle
+            else:
+                return entry
+        return None
+
+
+def enable(path: typing.Optional[str]=None, rebuild: bool=True) -> MibIndex:
+    """Answer metadata cache misses from an on-disk index.
+
+    The index is validated on the first cache miss and rebuilt, when it is
+    missing or stale and rebuild is True.
+    """
+    index = MibIndex(path, rebuild=rebuild)
+    freebsd_sysctl.cache.mib_cache.index = index
+    return index
+
+
+def disable() -> None:
+    index = freebsd_sysctl.cache.mib_cache.index
+    freebsd_sysctl.cache.mib_cache.index = None
+    if index is not None:
+        index.close()
@@ -22,8 +22,119 @@
 # IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 import ctypes
-try:
-    dll = ctypes.CDLL("libc.so.7")
-except OSError:
+import functools
+import os
+import typing
+
+import freebsd_sysctl.cache
+
+LIBC_NAME = "libc.so.7"
+
+
+@functools.lru_cache(maxsize=None)
+def library_path() -> str:
+    """Return the path of the C library.
+
+    Searching it with ctypes.util spawns processes on some platforms,
+    so that the result is remembered for the lifetime of the process.
+    """
     import ctypes.util
-    dll = ctypes.CDLL(str(ctypes.util.find_library("c")), use_errno=True)
+    return str(ctypes.util.find_library("c"))
+
+
+def load() -> ctypes.CDLL:
+    """Load the C library and bind the sysctl prototypes."""
+    try:
+        library = ctypes.CDLL(LIBC_NAME, use_errno=True)
+    except OSError:
+        library = ctypes.CDLL(library_path(), use_errno=True)
+    _bind(library)
+    return library
+
+
+class LazyLibrary:
+    """Load the C library on first use instead of at import time.
+
+    Resolved functions are stored on the instance, so that only the first
+    access of each function goes through __getattr__.
+    """
+
+    _library: typing.Optional[ctypes.CDLL] = None
+
+    def __getattr__(self, name: str) -> typing.Any:
+        if name.startswith("__") is True:
+            raise AttributeError(name)
+        if self._library is None:
+            self._library = load()
+        function = getattr(self._library, name)
+        setattr(self, name, function)
+        return function
+
+
+dll: typing.Any = LazyLibrary()
+
+
+def use(backend: typing.Any) -> typing.Any:
+    """Replace the backend of all sysctl queries and return the previous one.
+
+    A backend provides sysctl(3) like the C library and optionally
+    sysctlnametomib(3) and kldnext(2). Errors are reported
+    with ctypes.set_errno(). Metadata cached from the previous backend is
+    dropped.
+    """
+    global dll
+    previous = dll
+    dll = backend
+    freebsd_sysctl.cache.mib_cache.invalidate()
+    freebsd_sysctl.cache.size_hints.invalidate()
+    return previous
+
+
+def _prototype(
+    library: ctypes.CDLL,
+    name: str,
+    restype: typing.Any,
+    *argtypes: typing.Any
+) -> typing.Optional[typing.Callable[..., int]]:
+    function = getattr(library, name, None)
+    if function is not None:
+        function.restype = restype
+        function.argtypes = argtypes
+    return function
+
+
+class SysctlError(OSError):
+    """A sysctl(3) call failed with an errno like ENOENT, EPERM or ENOMEM."""
+
+    def __init__(self, error: int, target: typing.Any) -> None:
+        super().__init__(error, f"{os.strerror(error)}: {target}")
+        self.target = target
+
+
+def check(result: int, target: typing.Any) -> None:
+    """Raise a SysctlError from errno when a libc call failed."""
+    if result != 0:
+        raise SysctlError(ctypes.get_errno(), target)
+
+
+def _bind(library: ctypes.CDLL) -> None:
+    """Declare the argument types, so that ctypes does not infer them."""
+    _prototype(
+        library,
+        "sysctl",
+        ctypes.c_int,
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.c_uint,
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.c_size_t),
+        ctypes.c_void_p,
+        ctypes.c_size_t
+    )
+    _prototype(
+        library,
+        "sysctlnametomib",
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_int),
+        ctypes.POINTER(ctypes.c_size_t)
+    )
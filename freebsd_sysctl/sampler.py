@@ -0,0 +1,132 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import time
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.types
+
+Values = typing.Dict[freebsd_sysctl.BatchKey, typing.Any]
+
+
+class Sample(typing.NamedTuple):
+    """Values of one tick with their change since the previous tick."""
+
+    timestamp: float
+    values: Values
+    deltas: Values
+    rates: Values
+
+
+def delta(old: int, new: int, bits: int) -> int:
+    """Return the difference of two integers of a fixed width.
+
+    The shortest distance modulo the width is used, so that counters that
+    wrapped around and gauges that decreased both have the correct delta.
+    """
+    modulus = 1 << bits
+    half = modulus >> 1
+    return ((new - old + half) % modulus) - half
+
+
+class Sampler:
+    """Read a fixed set of sysctls on an interval.
+
+    Iterating a Sampler reads a baseline and then yields a Sample every
+    interval seconds. Deltas and per-second rates are computed for integer
+    sysctls and arrays of them, like kern.cp_time. The underlying
+    SysctlBatch keeps its buffers, so that a tick only queries the values.
+    """
+
+    interval: float
+    batch: freebsd_sysctl.SysctlBatch
+    _widths: typing.Optional[typing.Dict[freebsd_sysctl.BatchKey, int]]
+    _previous: typing.Optional[typing.Tuple[float, Values]]
+
+    def __init__(
+        self,
+        names_or_oids: typing.Iterable[freebsd_sysctl.NameOrOid],
+        interval: float=1.0
+    ) -> None:
+        self.interval = interval
+        self.batch = freebsd_sysctl.SysctlBatch(names_or_oids)
+        self._widths = None
+        self._previous = None
+
+    @property
+    def widths(self) -> typing.Dict[freebsd_sysctl.BatchKey, int]:
+        """Return the bit width of every integer sysctl by key."""
+        if self._widths is None:
+            self._widths = {
+                entry.key: entry.ctl_type.min_size * 8
+                for entry in self.batch.entries
+                if entry.ctl_type.unpack_format is not None
+                and entry.ctl_type is not freebsd_sysctl.types.NODE
+            }
+        return self._widths
+
+    def sample(self) -> Sample:
+        """Read all values and compare them to the previous sample.
+
+        Deltas and rates are empty on the first call.
+        """
+        timestamp = time.time()
+        now = time.monotonic()
+        values = self.batch.read()
+        deltas: Values = {}
+        rates: Values = {}
+        if self._previous is not None:
+            before, previous = self._previous
+            elapsed = now - before
+            for key, bits in self.widths.items():
+                change = self.__delta(previous[key], values[key], bits)
+                if change is None:
+                    continue
+                deltas[key] = change
+                if elapsed <= 0:
+                    continue
+                if isinstance(change, list) is True:
+                    rates[key] = [x / elapsed for x in change]
+                else:
+                    rates[key] = change / elapsed
+        self._previous = (now, values)
+        return Sample(timestamp, values, deltas, rates)
+
+    def __iter__(self) -> typing.Iterator[Sample]:
+        self.sample()
+        deadline = time.monotonic()
+        while True:
+            deadline += self.interval
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            yield self.sample()
+
+    @staticmethod
+    def __delta(old: typing.Any, new: typing.Any, bits: int) -> typing.Any:
+        if isinstance(old, list) != isinstance(new, list):
+            return None  # an array grew from or shrank to one element
+        if isinstance(new, list) is False:
+            return delta(old, new, bits)
+        if len(old) != len(new):
+            return None  # the array changed its length
+        return [delta(x, y, bits) for x, y in zip(old, new)]
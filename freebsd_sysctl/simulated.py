@@ -0,0 +1,365 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Simulated libc implementing sysctl(3) against an in-memory MIB.
+
+A SimulatedLibc can replace the real C library as backend of all queries,
+for example loaded from a snapshot, so that the package and applications
+using it can be tested and benchmarked on other platforms.
+"""
+import bisect
+import collections
+import ctypes
+import errno
+import struct
+import time
+import typing
+
+import freebsd_sysctl.flags
+
+CTLTYPE_NODE = 1
+CTLTYPE_INT = 2
+CTLTYPE_STRING = 3
+CTLTYPE_S64 = 4
+CTLTYPE_OPAQUE = 5
+CTLTYPE_UINT = 6
+CTLTYPE_LONG = 7
+CTLTYPE_ULONG = 8
+CTLTYPE_U64 = 9
+CTLTYPE_U8 = 10
+CTLTYPE_U16 = 11
+CTLTYPE_S8 = 12
+CTLTYPE_S16 = 13
+CTLTYPE_S32 = 14
+CTLTYPE_U32 = 15
+
+
+class SimulatedNode:
+
+    def __init__(
+        self,
+        name: str,
+        oid: typing.Tuple[int, ...],
+        kind: int,
+        fmt: str,
+        value: bytes=b"",
+        description: str=""
+    ) -> None:
+        self.name = name
+        self.oid = oid
+        self.kind = kind
+        self.fmt = fmt
+        self.value = value
+        self.description = description
+
+    @property
+    def is_node(self) -> bool:
+        return (self.kind & 0xF) == CTLTYPE_NODE
+
+
+def _address(pointer: typing.Any) -> int:
+    if pointer is None:
+        return 0
+    if isinstance(pointer, int):
+        return pointer
+    if isinstance(pointer, bytes):
+        pointer = ctypes.c_char_p(pointer)
+    if isinstance(pointer, ctypes.Array):
+        return ctypes.addressof(pointer)
+    # ctypes.cast() would keep a reference to exported buffers
+    return ctypes.c_void_p.from_buffer(pointer).value or 0
+
+
+def _integer(value: typing.Any) -> int:
+    if isinstance(value, int):
+        return value
+    return int(value.value)
+
+
+class SimulatedLibc:
+    """Stand-in for freebsd_sysctl.libc.dll that counts sysctl(3) calls.
+
+    Every call can be delayed by a latency in seconds and value queries by
+    an additional value_latency, like large opaque tables are slower.
+    time.sleep() releases the GIL like a foreign call into the kernel does.
+    """
+
+    latency: float
+    value_latency: float
+
+    def __init__(self, latency: float=0, value_latency: float=0) -> None:
+        self.latency = latency
+        self.value_latency = value_latency
+        self.nodes_by_oid: typing.Dict[typing.Tuple[int, ...], SimulatedNode]
+        self.nodes_by_oid = {}
+        self.nodes_by_name: typing.Dict[str, SimulatedNode] = {}
+        self._sorted_oids: typing.List[typing.Tuple[int, ...]] = []
+        self._last_child: typing.Dict[typing.Tuple[int, ...], int] = {}
+        self.calls: typing.Counter[str] = collections.Counter()
+        self.kld_files: typing.List[int] = [1]
+
+    def add(
+        self,
+        name: str,
+        kind: int,
+        fmt: str,
+        value: bytes=b"",
+        description: str="",
+        oid: typing.Optional[typing.Sequence[int]]=None
+    ) -> SimulatedNode:
+        """Add a sysctl and its parent nodes.
+
+        OIDs are numbered in order of insertion unless one is given.
+        """
+        components = name.split(".")
+        parent_oid: typing.Tuple[int, ...] = ()
+        for depth in range(1, len(components)):
+            parent_name = ".".join(components[:depth])
+            if parent_name not in self.nodes_by_name:
+                if oid is None:
+                    number = self._next_number(parent_oid)
+                else:
+                    number = self._use_number(parent_oid, oid[depth - 1])
+                parent = SimulatedNode(
+                    name=parent_name,
+                    oid=parent_oid + (number,),
+                    kind=CTLTYPE_NODE | freebsd_sysctl.flags.RD,
+                    fmt="N"
+                )
+                self._insert(parent)
+            parent_oid = self.nodes_by_name[parent_name].oid
+        if oid is None:
+            number = self._next_number(parent_oid)
+        else:
+            number = self._use_number(parent_oid, oid[-1])
+        node = SimulatedNode(
+            name=name,
+            oid=parent_oid + (number,),
+            kind=kind,
+            fmt=fmt,
+            value=value,
+            description=description
+        )
+        self._insert(node)
+        return node
+
+    def remove(self, name: str) -> None:
+        """Remove a sysctl or node with its children, like detached devices."""
+        prefix = self.nodes_by_name[name].oid
+        for oid in [x for x in self._sorted_oids if x[:len(prefix)] == prefix]:
+            node = self.nodes_by_oid.pop(oid)
+            del self.nodes_by_name[node.name]
+            self._sorted_oids.remove(oid)
+
+    def _next_number(self, parent: typing.Tuple[int, ...]) -> int:
+        self._last_child[parent] = self._last_child.get(parent, 0) + 1
+        return self._last_child[parent]
+
+    def _use_number(self, parent: typing.Tuple[int, ...], number: int) -> int:
+        self._last_child[parent] = max(self._last_child.get(parent, 0), number)
+        return number
+
+    def _insert(self, node: SimulatedNode) -> None:
+        self.nodes_by_oid[node.oid] = node
+        self.nodes_by_name[node.name] = node
+        bisect.insort(self._sorted_oids, node.oid)
+
+    def sysctl(
+        self,
+        name: typing.Any,
+        namelen: typing.Any,
+        oldp: typing.Any,
+        oldlenp: typing.Any,
+        newp: typing.Any,
+        newlen: typing.Any=0
+    ) -> int:
+        length = _integer(namelen)
+        mib = tuple((ctypes.c_int * length).from_address(_address(name)))
+        oldp = _address(oldp)
+        oldlenp = _address(oldlenp)
+        newp = _address(newp)
+        newlen = _integer(newlen)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        try:
+            if mib[:1] == (0,) and (len(mib) >= 2):
+                return self._meta(mib[1], mib[2:], oldp, oldlenp, newp, newlen)
+            if self.value_latency > 0:
+                time.sleep(self.value_latency)
+            return self._value(mib, oldp, oldlenp, newp, newlen)
+        except OSError as e:
+            ctypes.set_errno(e.errno)
+            return -1
+
+    def _meta(
+        self,
+        query: int,
+        oid: typing.Tuple[int, ...],
+        oldp: int,
+        oldlenp: int,
+        newp: int,
+        newlen: int
+    ) -> int:
+        if query == 3:
+            self.calls["name2oid"] += 1
+            node = self._lookup_name(ctypes.string_at(newp, newlen))
+            data = struct.pack(f"{len(node.oid)}i", *node.oid)
+        elif query == 1:
+            self.calls["name"] += 1
+            data = self._lookup(oid).name.encode() + b"\x00"
+        elif query == 2:
+            self.calls["next"] += 1
+            next_oid = self._next(oid)
+            data = struct.pack(f"{len(next_oid)}i", *next_oid)
+        elif query == 4:
+            self.calls["oidfmt"] += 1
+            node = self._lookup(oid)
+            data = struct.pack("I", node.kind) + node.fmt.encode() + b"\x00"
+        elif query == 5:
+            self.calls["oiddescr"] += 1
+            node = self._lookup(oid)
+            if node.description == "":
+                raise OSError(errno.ENOENT, oid)  # like the kernel
+            data = node.description.encode() + b"\x00"
+        else:
+            raise OSError(errno.EOPNOTSUPP, query)
+        return self._copyout(data, oldp, oldlenp)
+
+    def _lookup_name(self, name: bytes) -> SimulatedNode:
+        decoded_name = name.rstrip(b"\x00").decode()
+        if decoded_name not in self.nodes_by_name:
+            raise OSError(errno.ENOENT, decoded_name)
+        return self.nodes_by_name[decoded_name]
+
+    def _lookup(self, oid: typing.Tuple[int, ...]) -> SimulatedNode:
+        if oid not in self.nodes_by_oid:
+            raise OSError(errno.ENOENT, oid)
+        return self.nodes_by_oid[oid]
+
+    def _next(self, oid: typing.Tuple[int, ...]) -> typing.Tuple[int, ...]:
+        index = bisect.bisect_right(self._sorted_oids, oid)
+        while index < len(self._sorted_oids):
+            candidate = self._sorted_oids[index]
+            if self.nodes_by_oid[candidate].is_node is False:
+                return candidate
+            index += 1
+        raise OSError(errno.ENOENT, oid)
+
+    def _value(
+        self,
+        oid: typing.Tuple[int, ...],
+        oldp: int,
+        oldlenp: int,
+        newp: int,
+        newlen: int
+    ) -> int:
+        node = self._lookup(oid)
+        if node.is_node is True:
+            raise OSError(errno.EISDIR, node.name)
+        if oldp == 0 and oldlenp != 0:
+            self.calls["probe"] += 1
+        else:
+            self.calls["value"] += 1
+        result = self._copyout(node.value, oldp, oldlenp)
+        if newp != 0:
+            self.calls["write"] += 1
+            if (node.kind & freebsd_sysctl.flags.WR) == 0:
+                raise OSError(errno.EPERM, node.name)
+            node.value = ctypes.string_at(newp, newlen)
+        return result
+
+    @staticmethod
+    def _copyout(data: bytes, oldp: int, oldlenp: int) -> int:
+        if oldlenp == 0:
+            return 0
+        p_length = ctypes.c_size_t.from_address(oldlenp)
+        if oldp == 0:
+            p_length.value = len(data)
+            return 0
+        length = min(p_length.value, len(data))
+        ctypes.memmove(oldp, data, length)
+        p_length.value = length
+        if length < len(data):
+            raise OSError(errno.ENOMEM, "buffer too small")
+        return 0
+
+    def kldnext(self, fileid: int) -> int:
+        """Return the ID of the linker file after fileid, or 0 at the end."""
+        for kld_file in self.kld_files:
+            if kld_file > fileid:
+                return kld_file
+        return 0
+
+
+class SimulatedLibcByName(SimulatedLibc):
+    """Simulated libc that additionally provides sysctlnametomib(3)."""
+
+    def sysctlnametomib(
+        self,
+        name: bytes,
+        mibp: typing.Any,
+        sizep: typing.Any
+    ) -> int:
+        self.calls["nametomib"] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        try:
+            node = self._lookup_name(name)
+        except OSError as e:
+            ctypes.set_errno(e.errno)
+            return -1
+        p_size = ctypes.c_size_t.from_address(_address(sizep))
+        length = min(p_size.value, len(node.oid))
+        mib = (ctypes.c_int * length).from_address(_address(mibp))
+        mib[:] = node.oid[:length]
+        p_size.value = length
+        return 0
+
+
+def from_snapshot(
+    snapshot: typing.Any,
+    libc_class: typing.Type[SimulatedLibc]=SimulatedLibcByName,
+    **kwargs: typing.Any
+) -> SimulatedLibc:
+    """Return a simulated libc with the MIB of a snapshot.
+
+    Sysctls that were not readable are simulated with an empty value.
+    """
+    libc = libc_class(**kwargs)
+    for entry in snapshot:
+        libc.add(
+            entry.name,
+            entry.kind,
+            entry.fmt,
+            b"" if (entry.data is None) else entry.data,
+            entry.description or "",
+            oid=entry.oid
+        )
+    return libc
+
+
+def load(path: str, **kwargs: typing.Any) -> SimulatedLibc:
+    """Return a simulated libc with the MIB of a snapshot file."""
+    import freebsd_sysctl.snapshot
+    return from_snapshot(freebsd_sysctl.snapshot.Snapshot.load(path), **kwargs)
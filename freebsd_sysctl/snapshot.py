@@ -0,0 +1,220 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Snapshots of the raw sysctl values of a tree and their differences.
+
+Snapshots are serialized in a compact binary format that can be loaded
+and compared on any platform, because only diff() decodes values.
+"""
+import ctypes
+import struct
+import time
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.types
+
+MAGIC = b"FBSDSNP\x01"
+HEADER = struct.Struct("<8sdI")  # magic, timestamp, entries
+RECORD = struct.Struct("<BIHHHI")  # oid, kind, name, fmt, description, data
+UNREADABLE = 0xFFFFFFFF
+NO_DESCRIPTION = 0xFFFF
+
+
+class SnapshotEntry(typing.NamedTuple):
+    """Metadata and raw value of a sysctl; data is None when unreadable."""
+
+    name: str
+    oid: typing.Tuple[int, ...]
+    kind: int
+    fmt: str
+    data: typing.Optional[bytes]
+    description: typing.Optional[str] = None
+
+    @property
+    def ctl_type(self) -> typing.Type[freebsd_sysctl.types.CtlType]:
+        return freebsd_sysctl.types.identify_type(self.kind, self.fmt)
+
+    @property
+    def value(self) -> typing.Any:
+        """Return the value decoded like Sysctl.value."""
+        if self.data is None:
+            return None
+        ctl_type = self.ctl_type
+        size = max(len(self.data), ctl_type.min_size)
+        data = (ctypes.c_char * size)()
+        ctypes.memmove(data, self.data, len(self.data))
+        return freebsd_sysctl.Sysctl.decode_value(ctl_type(data, size))
+
+
+class Change(typing.NamedTuple):
+    """Decoded values of a sysctl that differs; None when added or removed."""
+
+    name: str
+    old: typing.Any
+    new: typing.Any
+
+
+class Snapshot:
+    """Raw values of all sysctls below a prefix at one point in time."""
+
+    timestamp: float
+    entries: typing.List[SnapshotEntry]
+
+    def __init__(
+        self,
+        entries: typing.Iterable[SnapshotEntry],
+        timestamp: typing.Optional[float]=None
+    ) -> None:
+        self.entries = list(entries)
+        self.timestamp = time.time() if (timestamp is None) else timestamp
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> typing.Iterator[SnapshotEntry]:
+        return iter(self.entries)
+
+    @classmethod
+    def capture(
+        cls,
+        prefix: str="",
+        include_descriptions: bool=False
+    ) -> 'Snapshot':
+        """Record the raw values of all sysctls below a prefix."""
+        timestamp = time.time()
+        entries = []
+        records = freebsd_sysctl.walk(
+            prefix,
+            include_descriptions=include_descriptions,
+            raw_values=True
+        )
+        for record in records:
+            entries.append(SnapshotEntry(
+                record.name,
+                tuple(record.oid),
+                record.kind,
+                record.fmt,
+                record.value,
+                record.description
+            ))
+        return cls(entries, timestamp)
+
+    def to_bytes(self) -> bytes:
+        chunks = [HEADER.pack(MAGIC, self.timestamp, len(self.entries))]
+        for entry in self.entries:
+            name = entry.name.encode()
+            fmt = entry.fmt.encode()
+            description = b""
+            if entry.description is not None:
+                description = entry.description.encode()
+            data = b"" if (entry.data is None) else entry.data
+            chunks.append(RECORD.pack(
+                len(entry.oid),
+                entry.kind,
+                len(name),
+                len(fmt),
+                NO_DESCRIPTION if (entry.description is None)
+                else len(description),
+                UNREADABLE if (entry.data is None) else len(data)
+            ))
+            chunks.append(struct.pack(f"<{len(entry.oid)}i", *entry.oid))
+            chunks.append(name)
+            chunks.append(fmt)
+            chunks.append(description)
+            chunks.append(data)
+        return b"".join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Snapshot':
+        magic, timestamp, amount = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a sysctl snapshot")
+        view = memoryview(data)
+        offset = HEADER.size
+        entries = []
+        for _ in range(amount):
+            (
+                oid_length,
+                kind,
+                name_length,
+                fmt_length,
+                description_length,
+                data_length
+            ) = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            oid = struct.unpack_from(f"<{oid_length}i", data, offset)
+            offset += 4 * oid_length
+            name = str(view[offset:offset + name_length], "utf-8")
+            offset += name_length
+            fmt = str(view[offset:offset + fmt_length], "utf-8")
+            offset += fmt_length
+            description = None
+            if description_length != NO_DESCRIPTION:
+                description = str(
+                    view[offset:offset + description_length],
+                    "utf-8"
+                )
+                offset += description_length
+            value: typing.Optional[bytes] = None
+            if data_length != UNREADABLE:
+                value = bytes(view[offset:offset + data_length])
+                offset += data_length
+            entries.append(SnapshotEntry(
+                name,
+                oid,
+                kind,
+                fmt,
+                value,
+                description
+            ))
+        return cls(entries, timestamp)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Snapshot':
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def diff(a: Snapshot, b: Snapshot) -> typing.List[Change]:
+    """Return the sysctls whose raw values differ between two snapshots.
+
+    Raw bytes are compared first and only changed entries are decoded.
+    Sysctls only present in one snapshot have None as the other value.
+    """
+    new_entries = {entry.name: entry for entry in b.entries}
+    changes = []
+    for old in a.entries:
+        new = new_entries.pop(old.name, None)
+        if new is None:
+            changes.append(Change(old.name, old.value, None))
+        elif (old.data != new.data) or (old.kind != new.kind) \
+                or (old.fmt != new.fmt):
+            changes.append(Change(old.name, old.value, new.value))
+    for new in new_entries.values():
+        changes.append(Change(new.name, None, new.value))
+    return changes
@@ -0,0 +1,87 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Decoders for well-known opaque struct sysctls.
+
+Imported on the first lookup of an opaque type, not with the package.
+"""
+import typing
+
+import freebsd_sysctl.types
+
+from freebsd_sysctl.types import ArrayDecoder, StructDecoder
+
+
+class Loadavg(typing.NamedTuple):
+    ldavg: typing.Tuple[float, float, float]
+    fscale: int
+
+
+class Clockinfo(typing.NamedTuple):
+    hz: int
+    tick: int
+    spare: int
+    stathz: int
+    profhz: int
+
+
+class Timeval(typing.NamedTuple):
+    tv_sec: int
+    tv_usec: int
+
+
+class Vmtotal(typing.NamedTuple):
+    t_vm: int
+    t_avm: int
+    t_rm: int
+    t_arm: int
+    t_vmshr: int
+    t_avmshr: int
+    t_rmshr: int
+    t_armshr: int
+    t_free: int
+    t_rq: int
+    t_dw: int
+    t_pw: int
+    t_sl: int
+    t_sw: int
+
+
+def _loadavg(*values: int) -> Loadavg:
+    fscale = values[-1]
+    ldavg = tuple(x / fscale for x in values[:-1])
+    return Loadavg(ldavg, fscale)  # type: ignore
+
+
+WELL_KNOWN: typing.Dict[str, freebsd_sysctl.types.Decoder] = {
+    "S,loadavg": StructDecoder("3Il", _loadavg),
+    "S,clockinfo": StructDecoder("5i", Clockinfo),
+    "S,timeval": StructDecoder("ql", Timeval),
+    "S,vmtotal": StructDecoder("9Q5h6x", Vmtotal),
+    "S,pagesizes": ArrayDecoder("L")
+}
+
+for _fmt, _decoder in WELL_KNOWN.items():
+    # decoders registered before the first lookup take precedence
+    if _fmt not in freebsd_sysctl.types.STRUCT_TYPES:
+        freebsd_sysctl.types.register_struct(_fmt, _decoder)
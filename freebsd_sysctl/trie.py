@@ -0,0 +1,358 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""In-memory trie of the MIB for finding sysctls by pattern.
+
+The trie is built once from a tree walk and answers glob and regular
+expression queries without further sysctl(3) calls. Subtrees that cannot
+match a pattern are not visited.
+"""
+import collections
+import errno
+import fnmatch
+import re
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.cache
+
+NameOrOid = typing.Union[str, typing.Sequence[int]]
+Record = freebsd_sysctl.SysctlRecord
+
+_GLOB_CHARACTERS = re.compile(r"[*?\[]")
+_REGEX_CHARACTERS = frozenset(".^$*+?{}[]\\|()")
+_QUANTIFIERS = frozenset("*+?{")
+
+
+class TrieNode:
+
+    __slots__ = ("component", "oid", "children", "record")
+
+    component: str
+    oid: freebsd_sysctl.cache.OidKey
+    children: typing.MutableMapping[str, 'TrieNode']
+    record: typing.Optional[Record]
+
+    def __init__(
+        self,
+        component: str,
+        oid: freebsd_sysctl.cache.OidKey
+    ) -> None:
+        self.component = component
+        self.oid = oid
+        self.children = collections.OrderedDict()
+        self.record = None
+
+
+class _Component:
+    """Compiled component of a glob pattern."""
+
+    __slots__ = ("text", "is_literal", "is_recursive", "pattern")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.is_recursive = (text == "**")
+        self.is_literal = _GLOB_CHARACTERS.search(text) is None
+        self.pattern = re.compile(fnmatch.translate(text))
+
+    def matches(self, component: str) -> bool:
+        if self.is_literal is True:
+            return component == self.text
+        return self.pattern.match(component) is not None
+
+
+class MibTrie:
+    """Sysctls indexed by the components of their names and OIDs.
+
+    A glob component matches one component of a name with *, ? and [], and
+    ** matches any number of components. Patterns or prefixes that end on
+    a node match all sysctls below it, like sysctl(8) lists them. Results
+    are records without values in OID order, whose oid can be passed to a
+    SysctlBatch.
+
+    Sysctls whose names have another number of components than their OIDs,
+    because a component contains a dot, are not indexed but kept in skipped.
+
+    Updates must not run concurrently with queries.
+    """
+
+    visited: int
+    skipped: typing.Dict[str, Record]
+
+    def __init__(self) -> None:
+        self.root = TrieNode("", ())
+        self._nodes: typing.Dict[freebsd_sysctl.cache.OidKey, TrieNode] = {
+            (): self.root
+        }
+        self._size = 0
+        self.visited = 0
+        self.skipped = collections.OrderedDict()
+
+    @classmethod
+    def build(cls, prefixes: typing.Iterable[str]=("",)) -> 'MibTrie':
+        """Return a trie of all sysctls below the prefixes."""
+        trie = cls()
+        for prefix in prefixes:
+            for record in freebsd_sysctl.walk(prefix, include_values=False):
+                trie.insert(record)
+        return trie
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, name_or_oid: NameOrOid) -> bool:
+        return self.get(name_or_oid) is not None
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        return self._leaves(self.root)
+
+    def insert(self, record: Record) -> None:
+        """Add or replace a sysctl."""
+        components = record.name.split(".")
+        if len(components) != len(record.oid):
+            self.skipped[record.name] = record
+            return
+        node = self.root
+        for depth, component in enumerate(components, 1):
+            child = node.children.get(component)
+            if child is None:
+                child = TrieNode(component, tuple(record.oid[:depth]))
+                self.__add_child(node, child)
+                self._nodes[child.oid] = child
+            node = child
+        if node.record is None:
+            self._size += 1
+        node.record = record
+
+    def remove(self, name_or_oid: NameOrOid) -> None:
+        """Drop a sysctl or a node with all sysctls below it."""
+        node = self._node(name_or_oid)
+        if node is None:
+            return
+        if node is self.root:
+            self.clear()
+            return
+        for descendant in self.__descendants(node):
+            del self._nodes[descendant.oid]
+            if descendant.record is not None:
+                self._size -= 1
+        parent = self._nodes[node.oid[:-1]]
+        del parent.children[node.component]
+        while (parent is not self.root) and (len(parent.children) == 0):
+            del self._nodes[parent.oid]
+            grandparent = self._nodes[parent.oid[:-1]]
+            del grandparent.children[parent.component]
+            parent = grandparent
+
+    def clear(self) -> None:
+        self.root.children.clear()
+        self._nodes = {(): self.root}
+        self._size = 0
+        self.skipped.clear()
+
+    def reset_counters(self) -> None:
+        self.visited = 0
+
+    def update(self, prefix: str="") -> None:
+        """Walk a prefix again and replace its subtree.
+
+        Sysctls attached or detached since the trie was built, like the
+        dev.* nodes of devices, are added or removed.
+        """
+        try:
+            records = list(freebsd_sysctl.walk(prefix, include_values=False))
+        except freebsd_sysctl.SysctlError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            records = []
+        if prefix == "":
+            self.clear()
+        elif self._node(prefix) is not None:
+            self.remove(prefix)
+        for name in list(self.skipped):
+            if (name == prefix) or name.startswith(prefix + "."):
+                del self.skipped[name]
+        for record in records:
+            self.insert(record)
+
+    def get(self, name_or_oid: NameOrOid) -> typing.Optional[Record]:
+        """Return the record of a sysctl or None."""
+        node = self._node(name_or_oid)
+        return None if (node is None) else node.record
+
+    def below(self, name_or_oid: NameOrOid="") -> typing.Iterator[Record]:
+        """Iterate the sysctls at or below a name or OID prefix."""
+        node = self._node(name_or_oid)
+        if node is None:
+            return iter(())
+        return self._leaves(node)
+
+    def glob(self, pattern: str) -> typing.Iterator[Record]:
+        """Iterate the sysctls matching a pattern like dev.*.%desc."""
+        components = [_Component(x) for x in pattern.split(".")]
+        if pattern == "":
+            components = []
+        states = self.__closure(components, {0})
+        if len(components) in states:
+            return self._leaves(self.root)
+        return self.__glob(self.root, components, states)
+
+    def match(self, regex: typing.Any) -> typing.Iterator[Record]:
+        """Iterate the sysctls whose entire name matches a regular expression.
+
+        Only the subtree of the literal prefix of the expression is visited,
+        like net.inet.tcp for net\\.inet\\.tcp\\..*_timeout.
+        """
+        if isinstance(regex, str) is True:
+            regex = re.compile(regex)
+        prefix = ""
+        if (regex.flags & re.IGNORECASE) == 0:
+            prefix = _literal_prefix(regex.pattern)
+        if "." in prefix:
+            parent_name, partial = prefix.rsplit(".", 1)
+            parent = self._node(parent_name)
+        else:
+            parent, partial = self.root, prefix
+        if parent is None:
+            return
+        for child in list(parent.children.values()):
+            if child.component.startswith(partial) is False:
+                self.visited += 1
+                continue
+            for record in self._leaves(child):
+                if regex.fullmatch(record.name) is not None:
+                    yield record
+
+    def _node(self, name_or_oid: NameOrOid) -> typing.Optional[TrieNode]:
+        if isinstance(name_or_oid, str) is False:
+            return self._nodes.get(tuple(name_or_oid))  # type: ignore
+        node: typing.Optional[TrieNode] = self.root
+        if name_or_oid == "":
+            return node
+        for component in name_or_oid.split("."):  # type: ignore
+            node = node.children.get(component)  # type: ignore
+            if node is None:
+                return None
+        return node
+
+    def _leaves(self, node: TrieNode) -> typing.Iterator[Record]:
+        for descendant in self.__descendants(node):
+            if descendant.record is not None:
+                yield descendant.record
+
+    def __descendants(self, node: TrieNode) -> typing.Iterator[TrieNode]:
+        self.visited += 1
+        yield node
+        for child in list(node.children.values()):
+            yield from self.__descendants(child)
+
+    def __glob(
+        self,
+        node: TrieNode,
+        components: typing.List[_Component],
+        states: typing.Set[int]
+    ) -> typing.Iterator[Record]:
+        pending = [components[x] for x in states if x < len(components)]
+        if all(x.is_literal for x in pending) is True:
+            children = [node.children.get(x.text) for x in pending]
+            candidates = sorted(
+                (x for x in set(children) if x is not None),
+                key=lambda x: x.oid
+            )
+        else:
+            candidates = list(node.children.values())
+        for child in candidates:
+            next_states = self.__advance(components, states, child.component)
+            if len(components) in next_states:
+                yield from self._leaves(child)
+                continue
+            self.visited += 1
+            if len(next_states) > 0:
+                yield from self.__glob(child, components, next_states)
+
+    @classmethod
+    def __advance(
+        cls,
+        components: typing.List[_Component],
+        states: typing.Set[int],
+        component: str
+    ) -> typing.Set[int]:
+        next_states = set()
+        for state in states:
+            if state == len(components):
+                continue
+            if components[state].is_recursive is True:
+                next_states.add(state)
+            elif components[state].matches(component) is True:
+                next_states.add(state + 1)
+        return cls.__closure(components, next_states)
+
+    @staticmethod
+    def __closure(
+        components: typing.List[_Component],
+        states: typing.Set[int]
+    ) -> typing.Set[int]:
+        """Add the states after ** components that match nothing."""
+        states = set(states)
+        pending = list(states)
+        while len(pending) > 0:
+            state = pending.pop()
+            if (state < len(components)) and components[state].is_recursive:
+                if (state + 1) not in states:
+                    states.add(state + 1)
+                    pending.append(state + 1)
+        return states
+
+    @staticmethod
+    def __add_child(node: TrieNode, child: TrieNode) -> None:
+        """Keep children in OID order, walks insert them in that order."""
+        is_last = (len(node.children) == 0) or \
+            (node.children[next(reversed(node.children))].oid < child.oid)
+        node.children[child.component] = child
+        if is_last is False:
+            node.children = collections.OrderedDict(
+                sorted(node.children.items(), key=lambda x: x[1].oid)
+            )
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the text every match of a regular expression starts with."""
+    if "|" in pattern:
+        return ""
+    prefix = []
+    index = 0
+    while index < len(pattern):
+        character = pattern[index]
+        if character == "\\":
+            if (index + 1 == len(pattern)) or pattern[index + 1].isalnum():
+                break
+            prefix.append(pattern[index + 1])
+            index += 2
+            continue
+        if character in _REGEX_CHARACTERS:
+            if (character in _QUANTIFIERS) and (len(prefix) > 0):
+                prefix.pop()
+            break
+        prefix.append(character)
+        index += 1
+    return "".join(prefix)
@@ -21,38 +21,118 @@
 # STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
 # IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
+import array
 import ctypes
+import functools
 import typing
 import struct
 
 
+@functools.lru_cache(maxsize=256)
+def compile_struct(unpack_format: str, amount: int) -> struct.Struct:
+    """Return a cached struct.Struct for an array of a native type."""
+    return struct.Struct(f"{amount}{unpack_format}")
+
+
 class CtlType:
+    __slots__ = ("data", "size", "amount", "_values")
     min_size = 0
     data: bytes
+    size: int
+    amount: int
     ctype: typing.Optional[type] = None
     unpack_format: typing.Optional[str] = None
+    type_name = "unknown"  # as printed by sysctl -t
 
     def __init__(self, data: bytes, size: int) -> None:
         self.data = data
         self.size = size
-
-    @property
-    def amount(self):
-        if self.min_size == 0:
-            return 1
-        return int(self.size / self.min_size)
+        self.amount = 1 if (self.min_size == 0) else (size // self.min_size)
+        self._values = None
 
     @property
     def value(self) -> typing.Any:
         if self.unpack_format is None:
             return self.data.value
-        values = list(struct.unpack(
-            f"{self.unpack_format * self.amount}",
-            self.data
-        ))
+        values = self.as_tuple()
         if len(values) == 1:
             return values[0]
-        return values
+        return list(values)
+
+    @classmethod
+    def encode(cls, value: typing.Any) -> bytes:
+        """Return the raw bytes of a value to be written."""
+        if cls.unpack_format is None:
+            if isinstance(value, (bytes, bytearray)) is True:
+                return bytes(value)
+            raise TypeError(
+                f"Cannot encode {type(value).__name__} as {cls.__name__}"
+            )
+        if isinstance(value, (list, tuple)) is True:
+            values = list(value)
+        else:
+            values = [value]
+        try:
+            return compile_struct(cls.unpack_format, len(values)).pack(*values)
+        except struct.error as e:
+            raise ValueError(f"Cannot encode {value} as {cls.__name__}: {e}")
+
+    def as_tuple(self) -> typing.Tuple[typing.Any, ...]:
+        """Return the decoded values without copying them into a list."""
+        if self._values is None:
+            if self.unpack_format is None:
+                self._values = (self.value,)
+            else:
+                self._values = compile_struct(
+                    self.unpack_format,
+                    self.amount
+                ).unpack_from(self.data)
+        return self._values
+
+    def as_memoryview(
+        self,
+        shape: typing.Optional[typing.Sequence[int]]=None
+    ) -> memoryview:
+        """Return a typed memoryview on the raw data without decoding it."""
+        view = memoryview(self.data).cast("B")  # type: ignore
+        if self.unpack_format is None:
+            return view[:self.size]
+        view = view[:self.amount * self.min_size]
+        if shape is None:
+            return view.cast(self.unpack_format)
+        return view.cast(self.unpack_format, self.__shape(shape))
+
+    def as_array(self) -> array.array:
+        """Return the values as array.array of the native element type."""
+        if self.unpack_format is None:
+            return array.array("B", self.as_memoryview())
+        return array.array(self.unpack_format, self.as_memoryview())
+
+    def as_ndarray(
+        self,
+        shape: typing.Optional[typing.Sequence[int]]=None
+    ) -> typing.Any:
+        """Return the values as numpy.ndarray sharing the raw data.
+
+        NumPy is an optional dependency and only imported on demand.
+        """
+        import numpy
+        values = numpy.frombuffer(
+            self.data,  # type: ignore
+            dtype=numpy.dtype(self.unpack_format or "B"),
+            count=self.amount if self.unpack_format else self.size
+        )
+        if shape is None:
+            return values
+        return values.reshape(self.__shape(shape))
+
+    def __shape(self, shape: typing.Sequence[int]) -> typing.List[int]:
+        """Resolve a single -1 dimension of a shape hint like (-1, 5)."""
+        known = 1
+        for dimension in shape:
+            if dimension != -1:
+                known *= dimension
+        return [(self.amount // known) if (x == -1) else x for x in shape]
 
     def __str__(self) -> str:
         if self.amount == 1:
@@ -67,130 +147,222 @@ class CtlType:
 
 
 class NODE(CtlType):
+    __slots__ = ()
+    type_name = "node"
     ctype = ctypes.c_uint
     min_size = ctypes.sizeof(ctypes.c_uint)
     unpack_format = "I"
 
 
 class INT(CtlType):
+    __slots__ = ()
+    type_name = "integer"
     ctype = ctypes.c_int
     min_size = ctypes.sizeof(ctypes.c_int)
     unpack_format = "i"
 
 
 class STRING(CtlType):
+    __slots__ = ()
+    type_name = "string"
 
     @property
     def value(self) -> str:
         return self.data.value.decode()
 
+    @classmethod
+    def encode(cls, value: typing.Any) -> bytes:
+        if isinstance(value, str) is True:
+            return value.encode()
+        return super().encode(value)
+
 
 class S64(CtlType):
+    __slots__ = ()
+    type_name = "int64_t"
     ctype = ctypes.c_int64
     min_size = ctypes.sizeof(ctypes.c_int64)
     unpack_format = "q"
 
 
-class STRUCT(CtlType):
-    pass
+class OPAQUE(CtlType):
+    __slots__ = ()
+    type_name = "opaque"
+
 
+class STRUCT(OPAQUE):
+    """Opaque value with a registered decoder for its struct format."""
 
-class OPAQUE(CtlType):
-    pass
+    __slots__ = ()
+    fmt: typing.Optional[str] = None
+    decoder: typing.Optional['Decoder'] = None
+
+    @property
+    def value(self) -> typing.Any:
+        if self.decoder is None:
+            return super().value
+        if self._values is None:
+            self._values = (self.decoder.decode(self.data),)
+        return self._values[0]
 
 
 class UINT(CtlType):
+    __slots__ = ()
+    type_name = "unsigned integer"
     ctype = ctypes.c_uint
     min_size = ctypes.sizeof(ctypes.c_uint)
     unpack_format = "I"
 
 
 class LONG(CtlType):
+    __slots__ = ()
+    type_name = "long integer"
     ctype = ctypes.c_long
     min_size = ctypes.sizeof(ctypes.c_long)
     unpack_format = "l"
 
 
 class ULONG(CtlType):
+    __slots__ = ()
+    type_name = "unsigned long"
     ctype = ctypes.c_ulong
     min_size = ctypes.sizeof(ctypes.c_ulong)
     unpack_format = "L"
 
 
 class U64(CtlType):
+    __slots__ = ()
+    type_name = "uint64_t"
     ctype = ctypes.c_uint64
     min_size = ctypes.sizeof(ctypes.c_uint64)
     unpack_format = "Q"
 
 
 class U8(CtlType):
+    __slots__ = ()
+    type_name = "uint8_t"
     ctype = ctypes.c_uint8
     min_size = ctypes.sizeof(ctypes.c_uint8)
     unpack_format = "B"
 
 
 class U16(CtlType):
+    __slots__ = ()
+    type_name = "uint16_t"
     ctype = ctypes.c_uint16
     min_size = ctypes.sizeof(ctypes.c_uint16)
     unpack_format = "H"
 
 
 class S8(CtlType):
+    __slots__ = ()
+    type_name = "int8_t"
     ctype = ctypes.c_int8
     min_size = ctypes.sizeof(ctypes.c_int8)
     unpack_format = "b"
 
 
 class S16(CtlType):
+    __slots__ = ()
+    type_name = "int16_t"
     ctype = ctypes.c_int16
     min_size = ctypes.sizeof(ctypes.c_int16)
     unpack_format = "h"
 
 
 class S32(CtlType):
+    __slots__ = ()
+    type_name = "int32_t"
     ctype = ctypes.c_int32
     min_size = ctypes.sizeof(ctypes.c_int32)
     unpack_format = "i"
 
 
 class U32(CtlType):
+    __slots__ = ()
+    type_name = "uint32_t"
     ctype = ctypes.c_uint32
     min_size = ctypes.sizeof(ctypes.c_uint32)
     unpack_format = "I"
 
 
+class StructDecoder:
+    """Decode a C struct into a named tuple using a precompiled layout."""
+
+    __slots__ = ("layout", "record")
+
+    def __init__(
+        self,
+        layout: str,
+        record: typing.Callable[..., typing.Any]
+    ) -> None:
+        self.layout = struct.Struct(layout)
+        self.record = record
+
+    @property
+    def size(self) -> int:
+        return self.layout.size
+
+    def decode(self, data: typing.Any) -> typing.Any:
+        return self.record(*self.layout.unpack_from(data))
+
+
+class ArrayDecoder:
+    """Decode a C array of variable length into a tuple."""
+
+    __slots__ = ("element_format", "size")
+
+    def __init__(self, element_format: str) -> None:
+        self.element_format = element_format
+        self.size = struct.calcsize(element_format)
+
+    def decode(self, data: typing.Any) -> typing.Tuple[typing.Any, ...]:
+        amount = len(data) // self.size
+        return compile_struct(self.element_format, amount).unpack_from(data)
+
+
+Decoder = typing.Union[StructDecoder, ArrayDecoder]
+STRUCT_TYPES: typing.Dict[str, typing.Type[STRUCT]] = {}
+
+
+def register_struct(fmt: str, decoder: Decoder) -> typing.Type[STRUCT]:
+    """Register a decoder for opaque sysctls of a format like 'S,loadavg'."""
+    struct_type = type(fmt.split(",", 1)[-1], (STRUCT,), dict(
+        __slots__=(),
+        fmt=fmt,
+        decoder=decoder,
+        min_size=decoder.size
+    ))
+    STRUCT_TYPES[fmt] = struct_type
+    return struct_type
+
+
+# CtlType by the type bits of kind, the opaque entry is refined by fmt
+CTL_TYPES: typing.Tuple[typing.Optional[typing.Type[CtlType]], ...] = (
+    None,
+    NODE,
+    INT,
+    STRING,
+    S64,
+    OPAQUE,
+    UINT,
+    LONG,
+    ULONG,
+    U64,
+    U8,
+    U16,
+    S8,
+    S16,
+    S32,
+    U32
+)
+
+
 def identify_type(kind: int, fmt: bytes) -> CtlType:
-    ctl_type = kind & 0xF
-    if ctl_type == 1:
-        return NODE
-    elif ctl_type == 2:
-        return INT
-    elif ctl_type == 3:
-        return STRING
-    elif ctl_type == 4:
-        return S64
-    elif ctl_type == 5:
-        # return STRUCT if (fmt[0:1] == b"S") else OPAQUE
-        return OPAQUE
-    elif ctl_type == 6:
-        return UINT
-    elif ctl_type == 7:
-        return LONG
-    elif ctl_type == 8:
-        return ULONG
-    elif ctl_type == 9:
-        return U64
-    elif ctl_type == 10:
-        return U8
-    elif ctl_type == 11:
-        return U16
-    elif ctl_type == 12:
-        return S8
-    elif ctl_type == 13:
-        return S16
-    elif ctl_type == 14:
-        return S32
-    elif ctl_type == 15:
-        return U32
-    else:
-        raise Exception(f"Invalid ctl_type: {ctl_type}")
+    ctl_type = CTL_TYPES[kind & 0xF]
+    if ctl_type is OPAQUE:
+        import freebsd_sysctl.structs  # noqa: F401 registers formats once
+        return STRUCT_TYPES.get(fmt, OPAQUE)  # type: ignore
+    if ctl_type is None:
+        raise Exception(f"Invalid ctl_type: {kind & 0xF}")
+    return ctl_type  # type: ignore
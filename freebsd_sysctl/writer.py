@@ -0,0 +1,225 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""Streaming NDJSON and CSV writers for sysctl tree dumps.
+
+Records are written one at a time as the walk produces them, so that the
+memory use does not grow with the size of the tree.
+"""
+import csv
+import functools
+import io
+import json
+import typing
+
+import freebsd_sysctl
+import freebsd_sysctl.flags
+import freebsd_sysctl.types
+
+FIELDS = ("name", "oid", "type", "fmt", "flags", "value", "description")
+FORMATS = ("ndjson", "csv")
+COMPRESSIONS = ("gzip", "bz2", "xz")
+WRITE_CHUNK_SIZE = 256  # NDJSON lines per write to the stream
+GZIP_LEVEL = 6  # like gzip(1), level 9 is several times slower
+
+
+def _json_value(value: typing.Any) -> typing.Any:
+    if hasattr(value, "_asdict") is True:
+        return {k: _json_value(v) for k, v in value._asdict().items()}
+    if isinstance(value, (list, tuple)) is True:
+        return [_json_value(x) for x in value]
+    return value
+
+
+def _record_value(
+    record: freebsd_sysctl.SysctlRecord,
+    opaque: bool
+) -> typing.Any:
+    ctl_type = record.ctl_type
+    value = record.value
+    is_struct = issubclass(ctl_type, freebsd_sysctl.types.STRUCT)
+    is_opaque = issubclass(ctl_type, freebsd_sysctl.types.OPAQUE)
+    if (value is not None) and (is_opaque is True) and (is_struct is False):
+        if opaque is False:
+            return None
+        value = bytes(value).hex()
+    return value
+
+
+def record_dict(
+    record: freebsd_sysctl.SysctlRecord,
+    include_descriptions: bool=False,
+    opaque: bool=False
+) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Return a record as JSON serializable dict, or None to skip it.
+
+    Opaque values without a decoder are hex encoded when opaque is set
+    and skipped otherwise.
+    """
+    value = _record_value(record, opaque)
+    if value is None:
+        return None
+    data = dict(
+        name=record.name,
+        oid=record.oid,
+        type=record.ctl_type.type_name,
+        fmt=record.fmt,
+        flags=freebsd_sysctl.flags.names(record.kind),
+        value=_json_value(value)
+    )
+    if include_descriptions is True:
+        data["description"] = record.description
+    return data
+
+
+@functools.lru_cache(maxsize=256)
+def _json_metadata(
+    ctl_type: typing.Type[freebsd_sysctl.types.CtlType],
+    fmt: str,
+    kind: int
+) -> str:
+    """Return the JSON members shared by all records of one kind."""
+    return json.dumps(dict(
+        type=ctl_type.type_name,
+        fmt=fmt,
+        flags=freebsd_sysctl.flags.names(kind)
+    ))[1:-1]
+
+
+def _json_line(
+    record: freebsd_sysctl.SysctlRecord,
+    include_descriptions: bool,
+    opaque: bool
+) -> typing.Optional[str]:
+    """Return a record as NDJSON line like record_dict(), or None."""
+    value = _record_value(record, opaque)
+    if value is None:
+        return None
+    if type(value) is int:
+        encoded = str(value)
+    else:
+        encoded = json.dumps(_json_value(value))
+    line = "".join((
+        '{"name": ', json.dumps(record.name),
+        ', "oid": [', ", ".join(map(str, record.oid)), '], ',
+        _json_metadata(record.ctl_type, record.fmt, record.kind),
+        ', "value": ', encoded
+    ))
+    if include_descriptions is True:
+        line += ', "description": ' + json.dumps(record.description)
+    return line + "}\n"
+
+
+def _csv_row(data: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    value = data["value"]
+    if isinstance(value, list) is True:
+        value = " ".join(str(x) for x in value)
+    elif isinstance(value, dict) is True:
+        value = json.dumps(value)
+    return [
+        data["name"],
+        ".".join(str(x) for x in data["oid"]),
+        data["type"],
+        data["fmt"],
+        "|".join(data["flags"]),
+        str(value),
+        data.get("description") or ""
+    ]
+
+
+def _open(
+    file: typing.IO[typing.Any],
+    compression: typing.Optional[str]
+) -> typing.Tuple[typing.TextIO, typing.Optional[typing.IO[bytes]]]:
+    """Return a text stream on a file and the compressor in between."""
+    compressor: typing.Optional[typing.IO[bytes]]
+    if compression is None:
+        if isinstance(file, io.TextIOBase) is True:
+            return (file, None)  # type: ignore
+        compressor = None
+    elif compression == "gzip":
+        import gzip
+        compressor = gzip.GzipFile(  # type: ignore
+            fileobj=file,
+            mode="wb",
+            compresslevel=GZIP_LEVEL
+        )
+    elif compression == "bz2":
+        import bz2
+        compressor = bz2.BZ2File(file, mode="wb")  # type: ignore
+    elif compression == "xz":
+        import lzma
+        compressor = lzma.LZMAFile(file, mode="wb")  # type: ignore
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    binary = file if (compressor is None) else compressor
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    return (text, compressor)  # type: ignore
+
+
+def write(
+    records: typing.Iterable[freebsd_sysctl.SysctlRecord],
+    file: typing.IO[typing.Any],
+    format: str="ndjson",
+    compression: typing.Optional[str]=None,
+    include_descriptions: bool=False,
+    opaque: bool=True
+) -> int:
+    """Write records from walk() or dump() to a file and return the count.
+
+    Binary files can be compressed with gzip, bz2 or xz. The file itself
+    is not closed.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    stream, compressor = _open(file, compression)
+    count = 0
+    try:
+        if format == "csv":
+            writer = csv.writer(stream, lineterminator="\n")
+            writer.writerow(FIELDS)
+            for record in records:
+                data = record_dict(record, include_descriptions, opaque)
+                if data is None:
+                    continue
+                writer.writerow(_csv_row(data))
+                count += 1
+        else:
+            lines: typing.List[str] = []
+            for record in records:
+                line = _json_line(record, include_descriptions, opaque)
+                if line is None:
+                    continue
+                lines.append(line)
+                if len(lines) == WRITE_CHUNK_SIZE:
+                    stream.write("".join(lines))
+                    lines.clear()
+                count += 1
+            stream.write("".join(lines))
+    finally:
+        stream.flush()
+        if stream is not file:
+            stream.detach()  # keep the file open
+        if compressor is not None:
+            compressor.close()
+    return count
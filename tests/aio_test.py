@@ -0,0 +1,138 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import asyncio
+import time
+
+import pytest
+
+import freebsd_sysctl.aio
+import tests.simulated_libc
+
+LATENCY = 0.05
+
+
+@pytest.fixture
+def slow_libc(install_libc):
+    libc = install_libc(tests.simulated_libc.build_mib())
+    libc.latency = LATENCY
+    return libc
+
+
+def test_read(slow_libc):
+    async def main():
+        return await asyncio.gather(
+            freebsd_sysctl.aio.read("kern.ostype"),
+            freebsd_sysctl.aio.read([1, 2]),
+            freebsd_sysctl.aio.read_many(["kern.osrevision", "kern.cp_time"])
+        )
+
+    ostype, osrevision, values = asyncio.run(main())
+    assert ostype == "FreeBSD"
+    assert osrevision == 199506
+    assert values["kern.cp_time"] == [1200, 3, 950, 17, 88000]
+
+
+def test_identical_requests_are_coalesced(slow_libc):
+    async def main():
+        return await asyncio.gather(
+            *[freebsd_sysctl.aio.read("kern.osrevision") for _ in range(8)]
+        )
+
+    assert asyncio.run(main()) == [199506] * 8
+    assert slow_libc.calls["value"] == 1
+
+
+def test_requests_run_in_parallel(slow_libc):
+    names = [
+        "kern.ostype",
+        "kern.osrevision",
+        "kern.maxvnodes",
+        "vm.kmem_size"
+    ]
+
+    async def main():
+        # loop iterations block the event loop for less than one call
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(LATENCY / 10)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.gather(*[freebsd_sysctl.aio.read(x) for x in names])
+        ticker.cancel()
+        return ticks
+
+    start = time.monotonic()
+    ticks = asyncio.run(main())
+    elapsed = time.monotonic() - start
+    # every read needs three sequential calls when the cache is cold
+    assert elapsed < len(names) * 3 * LATENCY
+    assert ticks > 0
+
+
+def test_cancellation_keeps_other_waiters(slow_libc):
+    async def main():
+        first = asyncio.ensure_future(freebsd_sysctl.aio.read("kern.ostype"))
+        second = asyncio.ensure_future(freebsd_sysctl.aio.read("kern.ostype"))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "FreeBSD"
+
+
+def test_walk(slow_libc, monkeypatch):
+    monkeypatch.setattr(freebsd_sysctl.aio, "WALK_CHUNK_SIZE", 2)
+
+    async def main():
+        records = freebsd_sysctl.aio.walk("kern")
+        return [record.name async for record in records]
+
+    names = asyncio.run(main())
+    assert names == [record.name for record in freebsd_sysctl.walk("kern")]
+
+
+def test_walk_cancellation(slow_libc, monkeypatch):
+    monkeypatch.setattr(freebsd_sysctl.aio, "WALK_CHUNK_SIZE", 1)
+    seen = []
+
+    async def consume():
+        async for record in freebsd_sysctl.aio.walk():
+            seen.append(record.name)
+
+    async def main():
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(LATENCY * 8)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    total = len(list(freebsd_sysctl.walk()))
+    assert 0 < len(seen) < total
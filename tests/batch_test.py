@@ -0,0 +1,55 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import freebsd_sysctl
+
+BATCH_NAMES = [
+    "kern.ostype",
+    "kern.osrevision",
+    "kern.maxvnodes",
+    "kern.cp_time",
+    "kern.epoch.stats.epoch_calls"
+]
+
+
+def test_read_many(simulated_libc):
+    values = freebsd_sysctl.Sysctl.read_many(BATCH_NAMES + [[1, 2]])
+    assert values["kern.ostype"] == "FreeBSD"
+    assert values["kern.osrevision"] == 199506
+    assert values["kern.cp_time"] == [1200, 3, 950, 17, 88000]
+    assert values[(1, 2)] == 199506
+    for name in BATCH_NAMES:
+        assert values[name] == freebsd_sysctl.Sysctl(name).value, name
+
+
+def test_batch_reads_only_values(benchmark, simulated_libc):
+    batch = freebsd_sysctl.SysctlBatch(BATCH_NAMES)
+    batch.read()
+    simulated_libc.calls.clear()
+
+    values = benchmark(batch.read)
+
+    rounds = simulated_libc.calls["value"] // len(BATCH_NAMES)
+    assert rounds > 0
+    assert dict(simulated_libc.calls) == {"value": rounds * len(BATCH_NAMES)}
+    assert values["kern.maxvnodes"] == 112426
@@ -0,0 +1,76 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import errno
+import struct
+
+import pytest
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+FILE_TABLE = bytes(range(256)) * 4096
+
+
+@pytest.fixture
+def kern_file(simulated_libc):
+    simulated_libc.add(
+        "kern.file",
+        tests.simulated_libc.CTLTYPE_OPAQUE | freebsd_sysctl.flags.RD,
+        "S,xfile",
+        FILE_TABLE,
+        "Entire file table"
+    )
+    return freebsd_sysctl.Sysctl("kern.file")
+
+
+def test_raw_view(kern_file):
+    view = kern_file.raw_view
+    assert view.nbytes == len(FILE_TABLE)
+    assert view[:256] == FILE_TABLE[:256]
+    assert view.obj is kern_file.raw_value.data
+
+
+def test_read_into_grows_bytearray(kern_file, simulated_libc):
+    buffer = bytearray(1024)
+    assert kern_file.read_into(buffer) == len(FILE_TABLE)
+    assert buffer == FILE_TABLE
+    simulated_libc.calls.clear()
+    assert kern_file.read_into(buffer) == len(FILE_TABLE)
+    assert dict(simulated_libc.calls) == {"value": 1}
+
+
+def test_read_into_fixed_buffer(kern_file, simulated_libc):
+    buffer = memoryview(bytearray(len(FILE_TABLE) + 16))
+    assert kern_file.read_into(buffer) == len(FILE_TABLE)
+    assert buffer[:len(FILE_TABLE)] == FILE_TABLE
+
+    with pytest.raises(OSError) as e:
+        kern_file.read_into(memoryview(bytearray(16)))
+    assert e.value.errno == errno.ENOMEM
+
+
+def test_read_into_scalar(simulated_libc):
+    buffer = bytearray(4)
+    assert freebsd_sysctl.Sysctl("kern.osrevision").read_into(buffer) == 4
+    assert struct.unpack("i", buffer) == (199506,)
@@ -0,0 +1,95 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import ctypes
+import tracemalloc
+
+import freebsd_sysctl
+import freebsd_sysctl.buffers
+
+
+def query_metadata(oid):
+    freebsd_sysctl.Sysctl.query_fmt(oid)
+    freebsd_sysctl.Sysctl.query_description(oid)
+    freebsd_sysctl.Sysctl.oid2name(oid)
+    freebsd_sysctl.Sysctl.query_next(oid)
+
+
+class UnpooledBuffers(freebsd_sysctl.buffers.BufferPool):
+    """Allocate a new response buffer for every query."""
+
+    def buffer(self, size: int=freebsd_sysctl.buffers.BUFSIZ) -> ctypes.Array:
+        self._buffer = (ctypes.c_char * size)()
+        self.length.value = size
+        return self._buffer
+
+
+def peak_memory(oid, amount=100):
+    query_metadata(oid)
+    tracemalloc.start()
+    try:
+        for _ in range(amount):
+            query_metadata(oid)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def test_queries_reuse_buffers(benchmark, simulated_libc, monkeypatch):
+    oid = freebsd_sysctl.Sysctl.name2oid("kern.ostype")
+    benchmark(query_metadata, oid)
+
+    pooled = peak_memory(oid)
+    monkeypatch.setattr(freebsd_sysctl.buffers, "pool", UnpooledBuffers())
+    unpooled = peak_memory(oid)
+    assert pooled < freebsd_sysctl.buffers.BUFSIZ <= unpooled
+
+
+def test_buffer_is_not_retained(simulated_libc):
+    oid = freebsd_sysctl.Sysctl.name2oid("kern.cp_time")
+    ctl_type = freebsd_sysctl.types.LONG
+    query_metadata(oid)
+
+    tracemalloc.start()
+    try:
+        for _ in range(100):
+            freebsd_sysctl.Sysctl.query_fmt(oid)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert current < freebsd_sysctl.buffers.BUFSIZ
+
+    first = freebsd_sysctl.Sysctl.query_value(oid, 40, ctl_type)
+    freebsd_sysctl.Sysctl.query_value([1, 2], 4, freebsd_sysctl.types.INT)
+    assert first.value == [1200, 3, 950, 17, 88000]
+
+
+def test_children_end_of_tree(simulated_libc):
+    children = list(freebsd_sysctl.Sysctl("security.jail").children)
+    assert [x.name for x in children] == [
+        "security.jail.param.allow.mount",
+        "security.jail.param.children.max",
+        "security.jail.param.host.hostname",
+        "security.jail.enforce_statfs"
+    ]
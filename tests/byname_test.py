@@ -0,0 +1,83 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.cache
+import tests.simulated_libc
+
+LIBC_CLASSES = [
+    tests.simulated_libc.SimulatedLibc,
+    tests.simulated_libc.SimulatedLibcByName
+]
+
+
+def read_loadavg():
+    return freebsd_sysctl.Sysctl("vm.loadavg").value
+
+
+@pytest.mark.parametrize("libc_class,resolve", [
+    (tests.simulated_libc.SimulatedLibc, "name2oid"),
+    (tests.simulated_libc.SimulatedLibcByName, "nametomib")
+])
+def test_one_shot_read(install_libc, libc_class, resolve):
+    libc = install_libc(tests.simulated_libc.build_mib(libc_class))
+
+    assert read_loadavg().fscale == 2048
+    cold_calls = dict(libc.calls)
+    libc.calls.clear()
+    assert read_loadavg().fscale == 2048
+    warm_calls = dict(libc.calls)
+
+    # the name is resolved once and the value read without a size probe
+    assert cold_calls == {resolve: 1, "oidfmt": 1, "value": 1}
+    assert warm_calls == {"value": 1}
+
+
+def test_nametomib_regrow(install_libc):
+    libc = install_libc(tests.simulated_libc.build_mib(
+        tests.simulated_libc.SimulatedLibcByName
+    ))
+    table = bytes(range(256)) * 64
+    libc.add(
+        "kern.proc.all",
+        tests.simulated_libc.CTLTYPE_OPAQUE | freebsd_sysctl.flags.RD,
+        "S,kinfo_proc",
+        table
+    )
+    sysctl = freebsd_sysctl.Sysctl("kern.proc.all")
+    assert bytes(sysctl.raw_view) == table
+    assert sysctl.oid == list(libc.nodes_by_name["kern.proc.all"].oid)
+    assert libc.calls["nametomib"] == 1
+
+
+@pytest.mark.parametrize("libc_class", LIBC_CLASSES)
+def test_one_shot_benchmark(benchmark, install_libc, libc_class):
+    install_libc(tests.simulated_libc.build_mib(libc_class))
+
+    def read_cold():
+        freebsd_sysctl.cache.mib_cache.invalidate()
+        return read_loadavg()
+
+    assert benchmark(read_cold).fscale == 2048
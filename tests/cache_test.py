@@ -0,0 +1,98 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import freebsd_sysctl
+import freebsd_sysctl.cache
+import tests.simulated_libc
+
+
+def test_metadata_is_queried_once(simulated_libc):
+    first = freebsd_sysctl.Sysctl("kern.osrevision")
+    assert (first.kind, first.fmt, first.description) is not None
+    simulated_libc.calls.clear()
+    freebsd_sysctl.cache.mib_cache.reset_counters()
+
+    second = freebsd_sysctl.Sysctl("kern.osrevision")
+    assert second.oid == first.oid
+    assert second.fmt == "I"
+    assert second.description == "Operating system revision"
+    assert second.value == 199506
+
+    assert dict(simulated_libc.calls) == {"value": 1}
+    assert freebsd_sysctl.cache.mib_cache.misses == 0
+    assert freebsd_sysctl.cache.mib_cache.hits == 3
+
+
+def test_dynamic_oids_bypass_cache(simulated_libc):
+    for _ in range(2):
+        sysctl = freebsd_sysctl.Sysctl("dev.em.0.%desc")
+        assert sysctl.has_flag(freebsd_sysctl.flags.DYN)
+    assert simulated_libc.calls["name2oid"] == 2
+    assert simulated_libc.calls["oidfmt"] == 2
+    assert freebsd_sysctl.cache.mib_cache.get(sysctl.oid, "kind") is None
+
+
+def test_dynamic_oid_reattached(simulated_libc):
+    name = "dev.em.0.%desc"
+    detached = freebsd_sysctl.Sysctl(name).oid
+    node = simulated_libc.nodes_by_name[name]
+    simulated_libc.remove("dev.em.0")
+    simulated_libc.add(name, node.kind, node.fmt, node.value, node.description)
+
+    sysctl = freebsd_sysctl.Sysctl(name)
+    assert sysctl.oid != detached
+    assert sysctl.value == "Intel(R) PRO/1000 Network Connection"
+    assert freebsd_sysctl.cache.mib_cache.oid(name) is None
+
+
+def test_invalidate(simulated_libc):
+    freebsd_sysctl.Sysctl("kern.ostype").kind
+    freebsd_sysctl.cache.mib_cache.invalidate("kern.ostype")
+    freebsd_sysctl.Sysctl("kern.ostype").kind
+    assert simulated_libc.calls["name2oid"] == 2
+    assert simulated_libc.calls["oidfmt"] == 2
+
+
+def test_walk_larger_than_lru_bound(install_libc):
+    libc = install_libc(tests.simulated_libc.build_large_mib(10000))
+    cache = freebsd_sysctl.cache.mib_cache
+    assert sum(1 for _ in freebsd_sysctl.walk(include_values=False)) == 10000
+    libc.calls.clear()
+    cache.reset_counters()
+
+    assert sum(1 for _ in freebsd_sysctl.walk(include_values=False)) == 10000
+    assert cache.misses == 0
+    assert cache.hits == 10000
+    assert set(libc.calls) == {"next"}
+
+
+def test_lru_eviction():
+    cache = freebsd_sysctl.cache.MibCache(maxsize=2)
+    cache.update([1, 1], name="a.a", kind=2, fmt="I")
+    cache.update([1, 2], name="a.b", kind=2, fmt="I")
+    cache.get([1, 1], "kind")
+    cache.update([1, 3], name="a.c", kind=2, fmt="I")
+    assert len(cache) == 2
+    assert cache.oid("a.b") is None
+    assert cache.oid("a.a") == [1, 1]
+    assert cache.get([1, 3], "kind", "fmt") == (2, "I")
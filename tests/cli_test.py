@@ -0,0 +1,155 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import io
+import json
+import subprocess
+import sys
+
+import freebsd_sysctl
+import freebsd_sysctl.cli
+import freebsd_sysctl.snapshot
+import tests.simulated_libc
+
+
+def run(*argv):
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    exit_code = freebsd_sysctl.cli.main(list(argv), stdout, stderr)
+    return (exit_code, stdout.getvalue(), stderr.getvalue())
+
+
+def test_values(simulated_libc):
+    exit_code, stdout, _ = run("kern.ostype", "kern.cp_time", "vm.loadavg")
+    assert exit_code == 0
+    assert stdout == (
+        "kern.ostype: FreeBSD\n"
+        "kern.cp_time: 1200 3 950 17 88000\n"
+        "vm.loadavg: { 2.00 1.00 0.50 }\n"
+    )
+    assert run("-n", "kern.osrevision")[1] == "199506\n"
+
+
+def test_all(simulated_libc):
+    lines = run("-a")[1].splitlines()
+    assert len(lines) == len(list(freebsd_sysctl.walk()))
+    assert "kern.maxvnodes: 112426" in lines
+    assert run("-a", "security.jail.param")[1].count("\n") == 3
+
+
+def test_undescribed_sysctl(simulated_libc):
+    simulated_libc.nodes_by_name["kern.osrevision"].description = ""
+    exit_code, stdout, _ = run("-d", "kern")
+    assert exit_code == 0
+    assert "kern.osrevision: \n" in stdout
+    assert stdout.count("\n") == len(list(freebsd_sysctl.walk("kern")))
+
+
+def test_types_and_descriptions(simulated_libc):
+    assert run("-t", "kern.epoch")[1] == (
+        "kern.epoch.stats.epoch_calls: uint64_t\n"
+    )
+    stdout = run("-d", "kern.ostype")[1]
+    assert stdout == "kern.ostype: Operating system type\n"
+    assert simulated_libc.calls["value"] == 0
+
+
+def test_opaque(simulated_libc):
+    simulated_libc.add(
+        "kern.proc.all",
+        tests.simulated_libc.CTLTYPE_OPAQUE,
+        "S,kinfo_proc",
+        bytes(range(32))
+    )
+    assert run("kern.proc.all")[1] == ""
+    assert run("-o", "kern.proc.all")[1] == (
+        "kern.proc.all: Format:S,kinfo_proc Length:32 "
+        "Dump:0x000102030405060708090a0b0c0d0e0f...\n"
+    )
+
+
+def test_opaque_values_are_not_read(simulated_libc):
+    simulated_libc.add(
+        "kern.proc.all",
+        tests.simulated_libc.CTLTYPE_OPAQUE,
+        "S,kinfo_proc",
+        bytes(range(32))
+    )
+    simulated_libc.calls.clear()
+    stdout = run("-a", "kern")[1]
+    assert "kern.proc.all" not in stdout
+    assert simulated_libc.calls["value"] == stdout.count("\n")
+
+    simulated_libc.calls.clear()
+    run("-o", "kern.proc.all")
+    assert simulated_libc.calls["value"] == 1
+
+
+def test_unknown_oid(simulated_libc):
+    exit_code, stdout, stderr = run("kern.ostype", "kern.nonexistent")
+    assert exit_code == 1
+    assert stdout == "kern.ostype: FreeBSD\n"
+    assert stderr == "sysctl: unknown oid 'kern.nonexistent'\n"
+
+
+def test_json(simulated_libc):
+    records = json.loads(run("--json", "-d", "kern.cp_time", "vm")[1])
+    assert [x["name"] for x in records] == [
+        "kern.cp_time",
+        "vm.kmem_size",
+        "vm.loadavg"
+    ]
+    assert records[0] == dict(
+        name="kern.cp_time",
+        oid=list(simulated_libc.nodes_by_name["kern.cp_time"].oid),
+        type="long integer",
+        fmt="LU",
+        flags=["RD"],
+        value=[1200, 3, 950, 17, 88000],
+        description="CPU time statistics"
+    )
+    assert records[2]["value"]["fscale"] == 2048
+    assert json.loads(run("--json", "kern.nonexistent")[1]) == []
+
+
+def test_ndjson(simulated_libc):
+    lines = run("--ndjson", "-a")[1].splitlines()
+    names = [json.loads(line)["name"] for line in lines]
+    assert names == [x.name for x in freebsd_sysctl.walk()]
+
+
+def test_module_entry_point(simulated_libc, tmp_path):
+    path = str(tmp_path / "host.snapshot")
+    freebsd_sysctl.snapshot.Snapshot.capture().save(path)
+    output = subprocess.check_output([
+        sys.executable, "-m", "freebsd_sysctl",
+        "--snapshot", path, "-n", "kern.ostype"
+    ])
+    assert output == b"FreeBSD\n"
+
+
+def test_all_benchmark(benchmark, install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(2000))
+    list(freebsd_sysctl.walk())  # warm the metadata cache
+    stdout = benchmark(lambda: run("-a")[1])
+    assert stdout.count("\n") == 2000
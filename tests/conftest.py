@@ -1 +1,25 @@
-import pytest_benchmark
\ No newline at end of file
+import pytest
+import pytest_benchmark
+
+import freebsd_sysctl.cache
+import freebsd_sysctl.libc
+import tests.simulated_libc
+
+
+@pytest.fixture
+def install_libc(monkeypatch):
+    def install(libc):
+        monkeypatch.setattr(freebsd_sysctl.libc, "dll", libc)
+        freebsd_sysctl.cache.mib_cache.invalidate()
+        freebsd_sysctl.cache.mib_cache.reset_counters()
+        freebsd_sysctl.cache.size_hints.invalidate()
+        freebsd_sysctl.cache.size_hints.reset_counters()
+        return libc
+    yield install
+    freebsd_sysctl.cache.mib_cache.invalidate()
+    freebsd_sysctl.cache.size_hints.invalidate()
+
+
+@pytest.fixture
+def simulated_libc(install_libc):
+    return install_libc(tests.simulated_libc.build_mib())
@@ -0,0 +1,89 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import time
+
+import pytest
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+PREFIXES = ["kern", "vm", "security"]
+WORKERS = [1, 2, 4, 8]
+
+
+def test_dump_matches_walk(simulated_libc):
+    expected = []
+    for prefix in PREFIXES:
+        walked = freebsd_sysctl.walk(prefix, include_descriptions=True)
+        expected += list(walked)
+    records = list(freebsd_sysctl.dump(
+        PREFIXES,
+        workers=4,
+        include_descriptions=True
+    ))
+    assert records == expected
+
+
+def test_dump_raises_enumeration_errors(simulated_libc):
+    with pytest.raises(freebsd_sysctl.SysctlError):
+        list(freebsd_sysctl.dump(["kern", "does.not.exist"]))
+
+
+def test_dump_can_be_closed_early(install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(2000))
+    records = freebsd_sysctl.dump(["dev"], workers=2)
+    assert next(records).name == "dev.sim.0.counter0"
+    records.close()
+
+
+def slow_large_mib(install_libc):
+    libc = install_libc(tests.simulated_libc.build_large_mib(200))
+    libc.value_latency = 0.001
+    list(freebsd_sysctl.walk("dev", include_values=False))  # warm the cache
+    return libc
+
+
+def timed_dump(workers):
+    start = time.monotonic()
+    records = list(freebsd_sysctl.dump(["dev"], workers=workers))
+    assert len(records) == 200
+    return time.monotonic() - start
+
+
+def test_dump_scales_with_workers(install_libc):
+    slow_large_mib(install_libc)
+    serial = timed_dump(1)
+    parallel = timed_dump(8)
+    assert parallel < serial / 2
+
+
+@pytest.mark.parametrize("workers", WORKERS)
+def test_dump_benchmark(benchmark, install_libc, workers):
+    slow_large_mib(install_libc)
+    benchmark.extra_info["workers"] = workers
+    records = benchmark.pedantic(
+        lambda: list(freebsd_sysctl.dump(["dev"], workers=workers)),
+        rounds=3
+    )
+    assert len(records) == 200
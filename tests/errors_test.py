@@ -0,0 +1,86 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import errno
+
+import pytest
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+
+def test_unknown_name(simulated_libc):
+    with pytest.raises(freebsd_sysctl.SysctlError) as e:
+        freebsd_sysctl.Sysctl("kern.does_not_exist").oid
+    assert e.value.errno == errno.ENOENT
+    assert isinstance(e.value, OSError)
+
+
+def test_unknown_oid(simulated_libc):
+    with pytest.raises(freebsd_sysctl.SysctlError) as e:
+        freebsd_sysctl.Sysctl(oid=[1, 99]).name
+    assert e.value.errno == errno.ENOENT
+
+
+def test_value_grew_after_size_query(simulated_libc):
+    sysctl = freebsd_sysctl.Sysctl("kern.ostype")
+    assert sysctl.size == 8
+    simulated_libc.nodes_by_name["kern.ostype"].value = b"HardenedBSD\x00"
+    assert sysctl.value == "HardenedBSD"
+
+
+def test_batch_grows_buffer(simulated_libc):
+    batch = freebsd_sysctl.SysctlBatch(["kern.ostype"])
+    assert batch.read() == {"kern.ostype": "FreeBSD"}
+    simulated_libc.nodes_by_name["kern.ostype"].value = b"HardenedBSD\x00"
+    assert batch.read() == {"kern.ostype": "HardenedBSD"}
+
+
+def test_undescribed_sysctl(simulated_libc):
+    simulated_libc.nodes_by_name["kern.osrevision"].description = ""
+    assert freebsd_sysctl.Sysctl("kern.osrevision").description == ""
+    records = list(freebsd_sysctl.walk("kern", include_descriptions=True))
+    assert [x.description for x in records[:3]] == [
+        "Operating system type",
+        "",
+        "Target for maximum number of vnodes"
+    ]
+    dumped = list(freebsd_sysctl.dump(["kern"], include_descriptions=True))
+    assert dumped == records
+
+
+def test_prototyped_calls(install_libc):
+    libc = tests.simulated_libc.build_mib()
+    install_libc(tests.simulated_libc.PrototypedLibc(libc))
+
+    records = list(freebsd_sysctl.walk(include_descriptions=True))
+    assert len(records) > 0
+    assert freebsd_sysctl.Sysctl("kern.ostype").value == "FreeBSD"
+    freebsd_sysctl.Sysctl("kern.maxvnodes").value = 1
+    assert freebsd_sysctl.SysctlBatch(["kern.maxvnodes"]).read() == {
+        "kern.maxvnodes": 1
+    }
+    assert freebsd_sysctl.Sysctl("kern.cp_time").read_into(bytearray(4)) == 40
+    with pytest.raises(freebsd_sysctl.SysctlError) as e:
+        freebsd_sysctl.Sysctl("kern.does_not_exist").oid
+    assert e.value.errno == errno.ENOENT
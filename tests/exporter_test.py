@@ -0,0 +1,95 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import struct
+import threading
+import urllib.request
+
+import freebsd_sysctl.exporter
+import tests.simulated_libc
+
+
+def test_render(simulated_libc):
+    exporter = freebsd_sysctl.exporter.Exporter(
+        ["kern", "vm"],
+        allow=["kern.*", "vm.kmem_size"]
+    )
+    text = exporter.render()
+    assert "kern_ostype" not in text  # strings are not exported
+    assert "vm_loadavg" not in text
+    assert (
+        "# HELP sysctl_kern_osrevision Operating system revision\n"
+        "# TYPE sysctl_kern_osrevision gauge\n"
+        "sysctl_kern_osrevision 199506\n"
+    ) in text
+    assert (
+        "# TYPE sysctl_kern_cp_time gauge\n"
+        'sysctl_kern_cp_time{index="0"} 1200\n'
+        'sysctl_kern_cp_time{index="1"} 3\n'
+    ) in text
+    assert "sysctl_vm_kmem_size 4141416448\n" in text
+    assert "# HELP sysctl_kern_epoch_stats_epoch_calls #" in text
+
+
+def test_array_shrinks_to_one_element(simulated_libc):
+    exporter = freebsd_sysctl.exporter.Exporter(["kern.cp_time"])
+    assert 'sysctl_kern_cp_time{index="4"} 88000\n' in exporter.render()
+    simulated_libc.nodes_by_name["kern.cp_time"].value = struct.pack("l", 9)
+    text = exporter.render()
+    assert 'sysctl_kern_cp_time{index="0"} 9\n' in text
+    assert 'index="1"' not in text
+
+
+def test_counters(install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(3))
+    text = freebsd_sysctl.exporter.Exporter(["dev.sim"]).render()
+    assert "# TYPE sysctl_dev_sim_0_counter2 counter\n" in text
+
+
+def test_scrape_reads_only_values(benchmark, install_libc):
+    libc = install_libc(tests.simulated_libc.build_large_mib(3000))
+    exporter = freebsd_sysctl.exporter.Exporter(["dev.sim"])
+    exporter.build()
+    libc.calls.clear()
+
+    text = benchmark(exporter.render)
+    assert text.count("\n") == 3 * 3000
+    rounds = libc.calls["value"] // 3000
+    assert dict(libc.calls) == {"value": rounds * 3000}
+
+
+def test_http_server(simulated_libc):
+    exporter = freebsd_sysctl.exporter.Exporter(["kern.osrevision"])
+    server = freebsd_sysctl.exporter.server(exporter, ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert content_type == freebsd_sysctl.exporter.CONTENT_TYPE
+    assert body.endswith("sysctl_kern_osrevision 199506\n")
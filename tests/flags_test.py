@@ -0,0 +1,82 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.flags
+import freebsd_sysctl.types
+
+Flags = freebsd_sysctl.flags.flag_type()
+
+
+def test_secure_is_not_shadowed():
+    assert freebsd_sysctl.flags.SECURE == 0x08000000
+    assert freebsd_sysctl.flags.SECURE_MASK == 0x00F00000
+    assert freebsd_sysctl.flags.securelevel(0x00300000) == 3
+    assert freebsd_sysctl.flags.names(0x08000000) == ("SECURE",)
+
+
+def test_decode_flags():
+    kind = freebsd_sysctl.flags.RWTUN | freebsd_sysctl.flags.MPSAFE | 2
+    flags = freebsd_sysctl.flags.decode(kind)
+    assert isinstance(flags, Flags)
+    assert Flags.RWTUN in flags
+    assert Flags.DYN not in flags
+    assert int(flags) == kind & ~0xF
+    assert freebsd_sysctl.flags.decode(kind) is flags
+
+
+def test_sysctl_flags(simulated_libc):
+    sysctl = freebsd_sysctl.Sysctl("kern.maxvnodes")
+    assert sysctl.flags == Flags.RW
+    assert (Flags.WR in sysctl.flags) is True
+    assert (Flags.WR in freebsd_sysctl.Sysctl("kern.ostype").flags) is False
+
+
+def test_filter_records(simulated_libc):
+    records = freebsd_sysctl.walk("kern", include_values=False)
+    writable = [x.name for x in records if Flags.WR in x.flags]
+    assert writable == ["kern.maxvnodes", "kern.poweroff_on_panic"]
+
+
+def test_ctl_type_is_cached(simulated_libc):
+    sysctl = freebsd_sysctl.Sysctl("kern.ostype")
+    assert sysctl.ctl_type is freebsd_sysctl.types.STRING
+    calls = simulated_libc.calls.copy()
+    assert sysctl.ctl_type is freebsd_sysctl.types.STRING
+    assert simulated_libc.calls == calls
+
+
+@pytest.mark.parametrize("ctl_type", [
+    x for x in freebsd_sysctl.types.CTL_TYPES if x is not None
+])
+def test_identify_type(ctl_type):
+    kind = freebsd_sysctl.types.CTL_TYPES.index(ctl_type)
+    kind |= freebsd_sysctl.flags.RD
+    assert freebsd_sysctl.types.identify_type(kind, "") is ctl_type
+
+
+def test_identify_invalid_type():
+    with pytest.raises(Exception):
+        freebsd_sysctl.types.identify_type(0, "")
@@ -41,7 +41,9 @@ def sysctl_types():
 
 
 def map_sysctl_type(ctl_type: freebsd_sysctl.types.CtlType) -> str:
-    if ctl_type == freebsd_sysctl.types.NODE:
+    if issubclass(ctl_type, freebsd_sysctl.types.STRUCT):
+        return "opaque"
+    elif ctl_type == freebsd_sysctl.types.NODE:
         return "node"
     elif ctl_type == freebsd_sysctl.types.INT:
         return "integer"
@@ -0,0 +1,102 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import ctypes.util
+import subprocess
+import sys
+
+import freebsd_sysctl.libc
+
+# cumulative microseconds of `import freebsd_sysctl` reported by -X importtime
+IMPORT_BUDGET_US = 100000
+DEFERRED_MODULES = ("ctypes.util", "subprocess", "freebsd_sysctl.structs")
+
+
+def import_times() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import freebsd_sysctl"],
+        stderr=subprocess.PIPE,
+        check=True
+    ).stderr.decode()
+    times = {}
+    for line in output.splitlines():
+        if line.startswith("import time:") is False:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() is False:
+            continue  # header
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_defers_libc_and_structs():
+    times = import_times()
+    assert "freebsd_sysctl" in times
+    for module in DEFERRED_MODULES:
+        assert module not in times
+
+
+def test_flag_type_is_built_on_first_use():
+    code = (
+        "import freebsd_sysctl.flags as flags; "
+        "print(flags.flag_type.cache_info().currsize); "
+        "flags.decode(flags.RW); "
+        "print(flags.flag_type.cache_info().currsize)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        check=True
+    ).stdout.decode()
+    assert output.split() == ["0", "1"]
+
+
+def test_import_time_budget():
+    best = min(import_times()["freebsd_sysctl"] for _ in range(3))
+    assert best < IMPORT_BUDGET_US
+
+
+def test_library_path_is_cached(tmp_path, monkeypatch):
+    lookups = []
+
+    def find_library(name):
+        lookups.append(name)
+        return "libc.so.6"
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(ctypes.util, "find_library", find_library)
+    freebsd_sysctl.libc.library_path.cache_clear()
+    try:
+        assert freebsd_sysctl.libc.library_path() == "libc.so.6"
+        assert freebsd_sysctl.libc.library_path() == "libc.so.6"
+    finally:
+        freebsd_sysctl.libc.library_path.cache_clear()
+    assert lookups == ["c"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_library_fallback(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(freebsd_sysctl.libc, "LIBC_NAME", "libc.so.999")
+    assert freebsd_sysctl.libc.load() is not None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,105 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import struct
+
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.cache
+import freebsd_sysctl.flags
+import freebsd_sysctl.index
+import tests.simulated_libc
+
+
+@pytest.fixture
+def indexed_libc(simulated_libc, tmp_path):
+    RD = freebsd_sysctl.flags.RD
+    simulated_libc.add(
+        "kern.version", tests.simulated_libc.CTLTYPE_STRING | RD, "A",
+        b"FreeBSD 12.1-RELEASE r354233 GENERIC\x00", "Kernel version"
+    )
+    simulated_libc.add(
+        "kern.boottime", tests.simulated_libc.CTLTYPE_OPAQUE | RD,
+        "S,timeval", struct.pack("ql", 1589700000, 0), "System boottime"
+    )
+    path = str(tmp_path / "mib.index")
+    freebsd_sysctl.index.build(path)
+    freebsd_sysctl.cache.mib_cache.invalidate()
+    simulated_libc.calls.clear()
+    yield (simulated_libc, path)
+    freebsd_sysctl.index.disable()
+
+
+def test_cold_start_without_metadata_syscalls(indexed_libc):
+    libc, path = indexed_libc
+    freebsd_sysctl.index.enable(path, rebuild=False)
+
+    sysctl = freebsd_sysctl.Sysctl("kern.osrevision")
+    assert sysctl.oid == list(libc.nodes_by_name["kern.osrevision"].oid)
+    assert sysctl.fmt == "I"
+    assert sysctl.description == "Operating system revision"
+    assert sysctl.value == 199506
+    assert freebsd_sysctl.Sysctl(oid=sysctl.oid).name == "kern.osrevision"
+
+    # three key values are read to validate the index
+    assert dict(libc.calls) == {"value": 4}
+    assert freebsd_sysctl.cache.mib_cache.index_hits == 1
+
+
+def test_lookup(indexed_libc):
+    libc, path = indexed_libc
+    index = freebsd_sysctl.index.MibIndex(path)
+    for name, node in libc.nodes_by_name.items():
+        entry = index.lookup(name)
+        if node.is_node or (node.kind & freebsd_sysctl.flags.DYN):
+            assert entry is None, name
+            continue
+        assert entry == index.lookup(node.oid)
+        assert entry.oid == node.oid
+        assert (entry.kind, entry.fmt) == (node.kind, node.fmt)
+        assert entry.description == node.description
+    assert index.lookup("kern.nonexistent") is None
+    assert index.lookup([99, 1]) is None
+
+
+def test_stale_index_is_rebuilt(indexed_libc):
+    libc, path = indexed_libc
+    libc.kld_files.append(7)  # a module was loaded
+    assert freebsd_sysctl.index.MibIndex(path).valid is False
+
+    index = freebsd_sysctl.index.enable(path, rebuild=True)
+    libc.add(
+        "kern.new_module", tests.simulated_libc.CTLTYPE_INT, "I",
+        struct.pack("i", 1)
+    )
+    assert freebsd_sysctl.Sysctl("kern.new_module").value == 1
+    assert index.valid is True
+    assert freebsd_sysctl.index.MibIndex(path).valid is True
+    assert index.lookup("kern.new_module") is not None
+
+
+def test_missing_index(simulated_libc, tmp_path):
+    index = freebsd_sysctl.index.MibIndex(str(tmp_path / "missing"))
+    assert index.valid is False
+    assert index.lookup("kern.ostype") is None
@@ -0,0 +1,61 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import ctypes
+import tracemalloc
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+MAX_BYTES_PER_ENTRY = 240
+
+
+def test_sysctl_slots():
+    sysctl = freebsd_sysctl.Sysctl("kern.ostype")
+    assert hasattr(sysctl, "__dict__") is False
+    raw_value = freebsd_sysctl.types.U64((ctypes.c_char * 8)(), 8)
+    assert hasattr(raw_value, "__dict__") is False
+
+
+def test_bytes_per_entry(benchmark, install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(10000))
+    records = list(freebsd_sysctl.walk("dev", include_values=False))
+    buffers = [(ctypes.c_char * 8)() for _ in records]
+
+    def build_entries():
+        return [(
+            freebsd_sysctl.Sysctl(name=record.name, oid=record.oid),
+            record.ctl_type(buf, 8)
+        ) for record, buf in zip(records, buffers)]
+
+    benchmark(build_entries)
+
+    tracemalloc.start()
+    try:
+        entries = build_entries()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    bytes_per_entry = current / len(entries)
+    benchmark.extra_info["bytes_per_entry"] = bytes_per_entry
+    assert bytes_per_entry < MAX_BYTES_PER_ENTRY
@@ -0,0 +1,100 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import itertools
+import struct
+
+import freebsd_sysctl.flags
+import freebsd_sysctl.sampler
+import tests.simulated_libc
+
+
+def test_deltas_and_rates(simulated_libc):
+    sampler = freebsd_sysctl.sampler.Sampler(
+        ["kern.cp_time", "kern.ostype"],
+        interval=0.01
+    )
+    cp_time = simulated_libc.nodes_by_name["kern.cp_time"]
+    first = sampler.sample()
+    assert (first.deltas, first.rates) == ({}, {})
+
+    cp_time.value = struct.pack("5l", 1210, 3, 960, 17, 88100)
+    second = sampler.sample()
+    assert second.values["kern.ostype"] == "FreeBSD"
+    assert second.deltas == {"kern.cp_time": [10, 0, 10, 0, 100]}
+    assert second.rates["kern.cp_time"][4] > second.rates["kern.cp_time"][0]
+    assert second.timestamp >= first.timestamp
+
+
+def test_array_length_changes(simulated_libc):
+    sampler = freebsd_sysctl.sampler.Sampler(["kern.cp_time"])
+    cp_time = simulated_libc.nodes_by_name["kern.cp_time"]
+    sampler.sample()
+    cp_time.value = struct.pack("l", 1300)
+    assert sampler.sample().deltas == {}
+    cp_time.value = struct.pack("2l", 1400, 5)
+    assert sampler.sample().deltas == {}
+    cp_time.value = struct.pack("2l", 1410, 5)
+    assert sampler.sample().deltas == {"kern.cp_time": [10, 0]}
+
+
+def test_wraparound_per_width(simulated_libc):
+    RD = freebsd_sysctl.flags.RD
+    u32 = simulated_libc.add(
+        "vm.stats.sys.v_intr", tests.simulated_libc.CTLTYPE_U32 | RD, "IU",
+        struct.pack("I", 2 ** 32 - 10)
+    )
+    u64 = simulated_libc.add(
+        "net.inet.tcp.stats.sndbyte", tests.simulated_libc.CTLTYPE_U64 | RD,
+        "QU", struct.pack("Q", 2 ** 64 - 1)
+    )
+    gauge = simulated_libc.add(
+        "vm.stats.vm.v_free_count", tests.simulated_libc.CTLTYPE_U32 | RD,
+        "IU", struct.pack("I", 5000)
+    )
+    sampler = freebsd_sysctl.sampler.Sampler([
+        "vm.stats.sys.v_intr",
+        "net.inet.tcp.stats.sndbyte",
+        "vm.stats.vm.v_free_count"
+    ])
+    sampler.sample()
+    u32.value = struct.pack("I", 5)
+    u64.value = struct.pack("Q", 2)
+    gauge.value = struct.pack("I", 4000)
+    assert sampler.sample().deltas == {
+        "vm.stats.sys.v_intr": 15,
+        "net.inet.tcp.stats.sndbyte": 3,
+        "vm.stats.vm.v_free_count": -1000
+    }
+
+
+def test_steady_state_reads_only_values(simulated_libc):
+    names = ["kern.cp_time", "kern.epoch.stats.epoch_calls"]
+    sampler = freebsd_sysctl.sampler.Sampler(names, interval=0)
+    samples = list(itertools.islice(sampler, 3))
+    assert len(samples) == 3
+    simulated_libc.calls.clear()
+
+    list(itertools.islice(sampler, 2))
+    # a new iteration reads one baseline and two ticks
+    assert dict(simulated_libc.calls) == {"value": 3 * len(names)}
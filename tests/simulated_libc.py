@@ -0,0 +1,146 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""MIBs for tests, simulated with freebsd_sysctl.simulated."""
+import ctypes
+import struct
+import typing
+
+import freebsd_sysctl.flags
+
+from freebsd_sysctl.simulated import (  # noqa: F401
+    CTLTYPE_NODE,
+    CTLTYPE_INT,
+    CTLTYPE_STRING,
+    CTLTYPE_S64,
+    CTLTYPE_OPAQUE,
+    CTLTYPE_UINT,
+    CTLTYPE_LONG,
+    CTLTYPE_ULONG,
+    CTLTYPE_U64,
+    CTLTYPE_U8,
+    CTLTYPE_U16,
+    CTLTYPE_S8,
+    CTLTYPE_S16,
+    CTLTYPE_S32,
+    CTLTYPE_U32,
+    SimulatedLibc,
+    SimulatedLibcByName
+)
+
+
+def build_mib(
+    libc_class: typing.Type[SimulatedLibc]=SimulatedLibc
+) -> SimulatedLibc:
+    """Return a small MIB modelled after a FreeBSD 12 amd64 host."""
+    libc = libc_class()
+    RD = freebsd_sysctl.flags.RD
+    RW = freebsd_sysctl.flags.RW
+    libc.add(
+        "kern.ostype", CTLTYPE_STRING | RD, "A", b"FreeBSD\x00",
+        "Operating system type"
+    )
+    libc.add(
+        "kern.osrevision", CTLTYPE_INT | RD, "I",
+        struct.pack("i", 199506), "Operating system revision"
+    )
+    libc.add(
+        "kern.maxvnodes", CTLTYPE_UINT | RW, "IU",
+        struct.pack("I", 112426), "Target for maximum number of vnodes"
+    )
+    libc.add(
+        "kern.cp_time", CTLTYPE_LONG | RD, "LU",
+        struct.pack("5l", 1200, 3, 950, 17, 88000), "CPU time statistics"
+    )
+    libc.add(
+        "kern.poweroff_on_panic", CTLTYPE_U8 | RW, "CU",
+        struct.pack("B", 0), "Do a power off instead of a reboot on a panic"
+    )
+    libc.add(
+        "kern.epoch.stats.epoch_calls", CTLTYPE_U64 | RD, "QU",
+        struct.pack("Q", 2 ** 40 + 7), "# of times a callback was run"
+    )
+    libc.add(
+        "vm.kmem_size", CTLTYPE_ULONG | RD, "LU",
+        struct.pack("L", 4141416448), "Size of kernel memory"
+    )
+    libc.add(
+        "vm.loadavg", CTLTYPE_OPAQUE | RD, "S,loadavg",
+        struct.pack("3I4xl", 4096, 2048, 1024, 2048),
+        "Machine loadaverage history"
+    )
+    libc.add(
+        "debug.skipped", CTLTYPE_INT | RD | freebsd_sysctl.flags.SKIP, "I",
+        struct.pack("i", 1), "Hidden from listings"
+    )
+    libc.add(
+        "dev.em.0.%desc", CTLTYPE_STRING | RD | freebsd_sysctl.flags.DYN, "A",
+        b"Intel(R) PRO/1000 Network Connection\x00", "device description"
+    )
+    for param in ("allow.mount", "children.max", "host.hostname"):
+        libc.add(
+            f"security.jail.param.{param}", CTLTYPE_INT | RD, "I",
+            struct.pack("i", 0), f"Jail parameter {param}"
+        )
+    libc.add(
+        "security.jail.enforce_statfs", CTLTYPE_INT | RW, "I",
+        struct.pack("i", 2),
+        "Processes in jail cannot see all mounted file systems (deprecated)"
+    )
+    return libc
+
+
+def build_large_mib(amount: int) -> SimulatedLibc:
+    """Return a MIB with `amount` integer leaves spread over a few nodes."""
+    libc = SimulatedLibc()
+    for index in range(amount):
+        libc.add(
+            f"dev.sim.{index // 100}.counter{index % 100}",
+            CTLTYPE_U64 | freebsd_sysctl.flags.RD | freebsd_sysctl.flags.STATS,
+            "QU",
+            struct.pack("Q", index),
+            f"Simulated counter {index}"
+        )
+    return libc
+
+
+class PrototypedLibc:
+    """Call a simulated libc through the ctypes prototype of the real one.
+
+    Arguments are converted according to the argtypes that freebsd_sysctl.libc
+    declares, so that incompatible arguments raise ctypes.ArgumentError.
+    """
+
+    def __init__(self, libc: SimulatedLibc) -> None:
+        self.libc = libc
+        self.calls = libc.calls
+        prototype = ctypes.CFUNCTYPE(
+            ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int),
+            ctypes.c_uint,
+            ctypes.c_void_p,
+            ctypes.POINTER(ctypes.c_size_t),
+            ctypes.c_void_p,
+            ctypes.c_size_t
+        )
+        self.sysctl = prototype(libc.sysctl)
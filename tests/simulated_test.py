@@ -0,0 +1,87 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import time
+
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.libc
+import freebsd_sysctl.simulated
+import freebsd_sysctl.snapshot
+import tests.simulated_libc
+
+
+@pytest.fixture
+def snapshot_file(simulated_libc, tmp_path):
+    path = str(tmp_path / "host.snapshot")
+    snapshot = freebsd_sysctl.snapshot.Snapshot.capture(
+        include_descriptions=True
+    )
+    snapshot.save(path)
+    return path
+
+
+def records():
+    return list(freebsd_sysctl.walk(include_descriptions=True))
+
+
+def test_backend_from_snapshot(simulated_libc, snapshot_file):
+    expected = records()
+    previous = freebsd_sysctl.libc.use(
+        freebsd_sysctl.simulated.load(snapshot_file)
+    )
+    try:
+        assert records() == expected
+        sysctl = freebsd_sysctl.Sysctl("kern.osrevision")
+        assert sysctl.oid == list(
+            simulated_libc.nodes_by_name["kern.osrevision"].oid
+        )
+        assert sysctl.value == 199506
+        assert freebsd_sysctl.Sysctl(oid=sysctl.oid[:1]).name == "kern"
+        with pytest.raises(freebsd_sysctl.SysctlError):
+            freebsd_sysctl.Sysctl("kern.nonexistent").oid
+    finally:
+        freebsd_sysctl.libc.use(previous)
+    assert freebsd_sysctl.libc.dll is simulated_libc
+
+
+def test_added_sysctls_keep_numbering(snapshot_file):
+    libc = freebsd_sysctl.simulated.load(snapshot_file)
+    node = libc.add(
+        "kern.new",
+        tests.simulated_libc.CTLTYPE_INT,
+        "I"
+    )
+    kern_children = [
+        oid for oid in libc.nodes_by_oid if oid[:1] == node.oid[:1]
+    ]
+    assert node.oid == max(kern_children)
+
+
+def test_latency(install_libc):
+    libc = install_libc(freebsd_sysctl.simulated.SimulatedLibc(latency=0.01))
+    libc.add("kern.ostype", tests.simulated_libc.CTLTYPE_STRING, "A", b"x\0")
+    start = time.monotonic()
+    freebsd_sysctl.Sysctl("kern.ostype").value
+    assert time.monotonic() - start >= 0.01 * sum(libc.calls.values())
@@ -0,0 +1,63 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import freebsd_sysctl
+import freebsd_sysctl.cache
+import freebsd_sysctl.flags
+import tests.simulated_libc
+
+
+def test_scalar_read_avoids_probe(simulated_libc):
+    freebsd_sysctl.Sysctl("kern.osrevision").value
+    simulated_libc.calls.clear()
+
+    assert freebsd_sysctl.Sysctl("kern.osrevision").value == 199506
+    assert dict(simulated_libc.calls) == {"value": 1}
+    assert freebsd_sysctl.cache.size_hints.probes == 0
+    assert freebsd_sysctl.cache.size_hints.probes_avoided == 2
+
+
+def test_growing_table_uses_size_hint(simulated_libc):
+    node = simulated_libc.add(
+        "kern.proc.all",
+        tests.simulated_libc.CTLTYPE_OPAQUE | freebsd_sysctl.flags.RD,
+        "S,kinfo_proc",
+        bytes(4096)
+    )
+    sysctl = freebsd_sysctl.Sysctl("kern.proc.all")
+    assert sysctl.raw_value.size == 4096
+    assert freebsd_sysctl.cache.size_hints.get(sysctl.oid) == 4096
+
+    # growth within the headroom is read without probing again
+    node.value = bytes(4096 + 256)
+    simulated_libc.calls.clear()
+    sysctl = freebsd_sysctl.Sysctl("kern.proc.all")
+    assert sysctl.raw_value.size == 4096 + 256
+    assert sysctl.size == 4096 + 256
+    assert dict(simulated_libc.calls) == {"value": 1}
+
+
+def test_walk_avoids_probes(simulated_libc):
+    records = list(freebsd_sysctl.walk("kern"))
+    assert len(records) > 0
+    assert simulated_libc.calls["probe"] == 0
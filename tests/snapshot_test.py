@@ -0,0 +1,114 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import struct
+import time
+
+import freebsd_sysctl
+import freebsd_sysctl.snapshot
+import tests.simulated_libc
+
+Snapshot = freebsd_sysctl.snapshot.Snapshot
+
+
+def test_capture_and_serialize(simulated_libc, tmp_path):
+    snapshot = Snapshot.capture("kern")
+    names = [entry.name for entry in snapshot]
+    assert names == [x.name for x in freebsd_sysctl.walk("kern")]
+    ostype = snapshot.entries[names.index("kern.ostype")]
+    assert ostype.data == b"FreeBSD\x00"
+    assert ostype.value == "FreeBSD"
+
+    path = str(tmp_path / "kern.snapshot")
+    snapshot.save(path)
+    loaded = Snapshot.load(path)
+    assert loaded.entries == snapshot.entries
+    assert loaded.timestamp == snapshot.timestamp
+
+
+def test_diff(simulated_libc):
+    before = Snapshot.capture()
+    simulated_libc.nodes_by_name["kern.maxvnodes"].value = struct.pack(
+        "I",
+        200000
+    )
+    simulated_libc.add(
+        "security.jail.param.allow.raw_sockets",
+        tests.simulated_libc.CTLTYPE_INT | freebsd_sysctl.flags.RD,
+        "I",
+        struct.pack("i", 0)
+    )
+    after = Snapshot.capture()
+
+    changes = freebsd_sysctl.snapshot.diff(before, after)
+    assert changes == [
+        freebsd_sysctl.snapshot.Change("kern.maxvnodes", 112426, 200000),
+        freebsd_sysctl.snapshot.Change(
+            "security.jail.param.allow.raw_sockets",
+            None,
+            0
+        )
+    ]
+    assert freebsd_sysctl.snapshot.diff(after, after) == []
+
+
+def test_diff_large_snapshots(benchmark, install_libc):
+    libc = install_libc(tests.simulated_libc.build_large_mib(20000))
+    before = Snapshot.capture("dev")
+    for i in range(0, 20000, 1000):
+        node = libc.nodes_by_name[f"dev.sim.{i // 100}.counter{i % 100}"]
+        node.value = struct.pack("Q", 1)
+    after = Snapshot.capture("dev")
+    data = after.to_bytes()
+
+    def load_and_diff():
+        return freebsd_sysctl.snapshot.diff(before, Snapshot.from_bytes(data))
+
+    changes = benchmark(load_and_diff)
+    assert len(changes) == 20
+
+
+def best_time(function, rounds=3):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def test_capture_large_snapshot(benchmark, install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(20000))
+    before = Snapshot.capture("dev")
+
+    def capture_and_diff():
+        return freebsd_sysctl.snapshot.diff(before, Snapshot.capture("dev"))
+
+    assert benchmark.pedantic(capture_and_diff, rounds=3) == []
+
+    # reading and diffing values must not cost much more than enumerating
+    # the OIDs, which is the lower bound of any capture
+    enumerate_time = best_time(
+        lambda: list(freebsd_sysctl.walk("dev", include_values=False))
+    )
+    assert best_time(capture_and_diff) < 3 * enumerate_time
@@ -0,0 +1,173 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import re
+import struct
+
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.flags
+import freebsd_sysctl.trie
+import tests.simulated_libc
+
+
+def names(records):
+    return [x.name for x in records]
+
+
+@pytest.fixture
+def trie(simulated_libc):
+    return freebsd_sysctl.trie.MibTrie.build()
+
+
+def test_build_matches_walk(simulated_libc, trie):
+    expected = list(freebsd_sysctl.walk(include_values=False))
+    assert list(trie) == expected
+    assert len(trie) == len(expected)
+    assert "kern.ostype" in trie
+    assert trie.get([1, 1]).name == "kern.ostype"
+    assert trie.get("kern") is None
+
+
+def test_queries_do_not_call_sysctl(simulated_libc, trie):
+    calls = simulated_libc.calls.copy()
+    list(trie.glob("**"))
+    list(trie.match(".*"))
+    list(trie.below("kern"))
+    assert simulated_libc.calls == calls
+
+
+def test_glob(trie):
+    assert names(trie.glob("kern.ostype")) == ["kern.ostype"]
+    assert names(trie.glob("kern.os*")) == ["kern.ostype", "kern.osrevision"]
+    assert names(trie.glob("kern.epoch")) == ["kern.epoch.stats.epoch_calls"]
+    assert names(trie.glob("*.loadavg")) == ["vm.loadavg"]
+    assert names(trie.glob("**.epoch_calls")) == [
+        "kern.epoch.stats.epoch_calls"
+    ]
+    assert names(trie.glob("kern.**.stats.**")) == [
+        "kern.epoch.stats.epoch_calls"
+    ]
+    assert names(trie.glob("kern.o[!s]*")) == []
+    assert names(trie.glob("kern.missing.*")) == []
+    assert names(trie.glob("")) == names(trie)
+
+
+def test_match(trie):
+    assert names(trie.match(r"kern\.os.*")) == [
+        "kern.ostype",
+        "kern.osrevision"
+    ]
+    ignore_case = re.compile("KERN.OSTYPE", re.I)
+    assert names(trie.match(ignore_case)) == ["kern.ostype"]
+    assert names(trie.match(r"vm\.loadavg|kern\.ostype")) == [
+        "kern.ostype",
+        "vm.loadavg"
+    ]
+
+
+@pytest.mark.parametrize("pattern,prefix", [
+    (r"net\.inet\.tcp\..*", "net.inet.tcp."),
+    (r"kern\.osrev", "kern.osrev"),
+    (r"kern\.os?", "kern.o"),
+    (r"kern\d", "kern"),
+    (r"(?i)kern", ""),
+    (r"kern|vm", "")
+])
+def test_literal_prefix(pattern, prefix):
+    assert freebsd_sysctl.trie._literal_prefix(pattern) == prefix
+
+
+def test_glob_prunes_subtrees(install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(1000))
+    trie = freebsd_sysctl.trie.MibTrie.build()
+
+    trie.reset_counters()
+    assert names(trie.glob("dev.sim.3.counter7")) == ["dev.sim.3.counter7"]
+    assert trie.visited == 4
+
+    trie.reset_counters()
+    records = list(trie.glob("dev.sim.*.counter7"))
+    assert len(records) == 10
+    assert trie.visited < 150
+
+    trie.reset_counters()
+    assert len(list(trie.match(r"dev\.sim\.3\..*"))) == 100
+    assert trie.visited < 150
+
+    values = freebsd_sysctl.SysctlBatch([x.oid for x in records]).read()
+    assert list(values.values()) == list(range(7, 1000, 100))
+
+
+def test_update(simulated_libc, trie):
+    simulated_libc.add(
+        "dev.cpu.0.temperature", 0x02 | freebsd_sysctl.flags.RD, "IK",
+        struct.pack("i", 3231)
+    )
+    simulated_libc.add(
+        "dev.cpu.1.temperature", 0x02 | freebsd_sysctl.flags.RD, "IK",
+        struct.pack("i", 3241)
+    )
+    assert names(trie.glob("dev.*.*.temperature")) == []
+    trie.update("dev")
+    assert names(trie.glob("dev.*.*.temperature")) == [
+        "dev.cpu.0.temperature",
+        "dev.cpu.1.temperature"
+    ]
+
+    simulated_libc.remove("dev.cpu.1")
+    trie.update("dev.cpu")
+    assert names(trie.below("dev.cpu")) == ["dev.cpu.0.temperature"]
+
+    simulated_libc.remove("dev")
+    trie.update("dev")
+    assert names(trie.below("dev")) == []
+    assert list(trie) == list(freebsd_sysctl.walk(include_values=False))
+
+
+def test_insert_keeps_oid_order(simulated_libc):
+    records = list(freebsd_sysctl.walk(include_values=False))
+    trie = freebsd_sysctl.trie.MibTrie()
+    for record in reversed(records):
+        trie.insert(record)
+    assert list(trie) == records
+
+    trie.remove("kern")
+    assert len(trie) == len([x for x in records if x.oid[0] != 1])
+    trie.remove("kern.missing")
+
+
+def test_insert_skips_mismatched_names(simulated_libc):
+    records = list(freebsd_sysctl.walk(include_values=False))
+    dotted = records[0]._replace(name=records[0].name + ".x")
+    trie = freebsd_sysctl.trie.MibTrie()
+    for record in [dotted] + records:
+        trie.insert(record)
+    assert list(trie) == records
+    assert list(trie.skipped.values()) == [dotted]
+    assert trie.get(dotted.name) is None
+
+    trie.update(dotted.name.split(".")[0])
+    assert trie.skipped == {}
+    assert list(trie) == records
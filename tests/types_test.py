@@ -0,0 +1,141 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import array
+import ctypes
+import struct
+import typing
+
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.structs
+import freebsd_sysctl.types
+
+CP_TIMES = list(range(128 * 5))
+
+
+def make_value(ctl_type, data):
+    buf = (ctypes.c_char * len(data)).from_buffer_copy(data)
+    return ctl_type(buf, len(data))
+
+
+def test_decode_modes():
+    raw_value = make_value(
+        freebsd_sysctl.types.LONG,
+        struct.pack(f"{len(CP_TIMES)}l", *CP_TIMES)
+    )
+    assert raw_value.amount == len(CP_TIMES)
+    assert raw_value.value == CP_TIMES
+    assert raw_value.as_tuple() == tuple(CP_TIMES)
+    assert raw_value.as_tuple() is raw_value.as_tuple()
+    assert raw_value.as_array() == array.array("l", CP_TIMES)
+    assert raw_value.as_memoryview().tolist() == CP_TIMES
+
+
+def test_decode_scalar():
+    raw_value = make_value(freebsd_sysctl.types.U8, b"\x07")
+    assert raw_value.value == 7
+    assert str(raw_value) == "7"
+
+
+def test_decode_cp_times(benchmark):
+    data = struct.pack(f"{len(CP_TIMES)}l", *CP_TIMES)
+
+    def decode():
+        return make_value(freebsd_sysctl.types.LONG, data).as_tuple()
+
+    assert benchmark(decode) == tuple(CP_TIMES)
+
+
+def test_loadavg(simulated_libc):
+    sysctl = freebsd_sysctl.Sysctl("vm.loadavg")
+    assert issubclass(sysctl.ctl_type, freebsd_sysctl.types.STRUCT)
+    loadavg = freebsd_sysctl.structs.Loadavg((2.0, 1.0, 0.5), 2048)
+    assert sysctl.value == loadavg
+
+
+def test_struct_decoders():
+    clockinfo = make_value(
+        freebsd_sysctl.types.identify_type(5, "S,clockinfo"),
+        struct.pack("5i", 1000, 1000, 0, 127, 8128)
+    )
+    assert clockinfo.value.stathz == 127
+
+    vmtotal_values = list(range(9)) + [1, 0, 0, 80, 0]
+    vmtotal = make_value(
+        freebsd_sysctl.types.identify_type(5, "S,vmtotal"),
+        struct.pack("9Q5h6x", *vmtotal_values)
+    )
+    assert vmtotal.value == freebsd_sysctl.structs.Vmtotal(*vmtotal_values)
+
+    pagesizes = make_value(
+        freebsd_sysctl.types.identify_type(5, "S,pagesizes"),
+        struct.pack("3L", 4096, 2097152, 1073741824)
+    )
+    assert pagesizes.value == (4096, 2097152, 1073741824)
+    assert str(pagesizes) == "4096 2097152 1073741824"
+
+    unknown = freebsd_sysctl.types.identify_type(5, "S,efi_map_header")
+    assert unknown == freebsd_sysctl.types.OPAQUE
+
+
+def test_register_struct(monkeypatch):
+    monkeypatch.setattr(freebsd_sysctl.types, "STRUCT_TYPES", {})
+
+    class Xvnode(typing.NamedTuple):
+        xv_size: int
+        xv_id: int
+
+    freebsd_sysctl.types.register_struct(
+        "S,xvnode",
+        freebsd_sysctl.types.StructDecoder("Nq", Xvnode)
+    )
+    ctl_type = freebsd_sysctl.types.identify_type(5, "S,xvnode")
+    raw_value = make_value(ctl_type, struct.pack("Nq", 16, 42))
+    assert raw_value.value == Xvnode(16, 42)
+    assert raw_value.value is raw_value.value
+
+
+def test_decode_shape():
+    raw_value = make_value(
+        freebsd_sysctl.types.LONG,
+        struct.pack(f"{len(CP_TIMES)}l", *CP_TIMES)
+    )
+    view = raw_value.as_memoryview(shape=(-1, 5))
+    assert view.shape == (128, 5)
+    assert view[127, 4] == CP_TIMES[-1]
+
+
+def test_decode_ndarray():
+    numpy = pytest.importorskip("numpy")
+    previous = make_value(
+        freebsd_sysctl.types.LONG,
+        struct.pack(f"{len(CP_TIMES)}l", *CP_TIMES)
+    ).as_ndarray(shape=(-1, 5))
+    current = make_value(
+        freebsd_sysctl.types.LONG,
+        struct.pack(f"{len(CP_TIMES)}l", *[x * 2 for x in CP_TIMES])
+    ).as_ndarray(shape=(-1, 5))
+    assert current.shape == (128, 5)
+    assert numpy.array_equal(current - previous, previous)
@@ -0,0 +1,68 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import itertools
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+
+def test_walk_tree(simulated_libc):
+    records = list(freebsd_sysctl.walk(include_descriptions=True))
+    names = [x.name for x in records]
+    assert names == [
+        sysctl.name for sysctl in simulated_libc.nodes_by_oid.values()
+        if (sysctl.is_node is False) and (sysctl.name != "debug.skipped")
+    ]
+    for record in records:
+        sysctl = freebsd_sysctl.Sysctl(record.name)
+        assert record.oid == sysctl.oid
+        assert record.ctl_type == sysctl.ctl_type
+        assert record.value == sysctl.value
+        assert record.description == sysctl.description
+
+
+def test_walk_prefix(simulated_libc):
+    records = list(freebsd_sysctl.walk("kern.epoch", include_values=False))
+    assert [x.name for x in records] == ["kern.epoch.stats.epoch_calls"]
+    assert records[0].value is None
+
+    leaf, = freebsd_sysctl.walk("kern.ostype")
+    assert leaf.value == "FreeBSD"
+
+
+def test_walk_streams(install_libc):
+    libc = install_libc(tests.simulated_libc.build_large_mib(1000))
+
+    first = list(itertools.islice(freebsd_sysctl.walk("dev.sim"), 3))
+    assert [x.value for x in first] == [0, 1, 2]
+    assert libc.calls["next"] == 3
+
+
+def test_walk_benchmark(benchmark, install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(2000))
+
+    def dump():
+        return sum(1 for _ in freebsd_sysctl.walk("dev"))
+
+    assert benchmark(dump) == 2000
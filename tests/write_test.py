@@ -0,0 +1,76 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import errno
+
+import pytest
+
+import freebsd_sysctl
+import tests.simulated_libc
+
+
+def test_value_setter(simulated_libc):
+    sysctl = freebsd_sysctl.Sysctl("kern.maxvnodes")
+    assert sysctl.value == 112426
+    sysctl.value = 200000
+    assert sysctl.value == 200000
+    assert freebsd_sysctl.Sysctl("kern.maxvnodes").value == 200000
+
+
+def test_value_setter_string(simulated_libc):
+    simulated_libc.add(
+        "kern.hostname",
+        tests.simulated_libc.CTLTYPE_STRING | freebsd_sysctl.flags.RW,
+        "A",
+        b"localhost\x00",
+        "Hostname"
+    )
+    freebsd_sysctl.Sysctl("kern.hostname").value = "jail.example.com"
+    assert freebsd_sysctl.Sysctl("kern.hostname").value == "jail.example.com"
+
+
+def test_read_only(simulated_libc):
+    with pytest.raises(freebsd_sysctl.SysctlError) as e:
+        freebsd_sysctl.Sysctl("kern.ostype").value = "Linux"
+    assert e.value.errno == errno.EPERM
+    assert simulated_libc.calls["write"] == 0
+
+
+def test_set_many(simulated_libc):
+    results = freebsd_sysctl.Sysctl.set_many({
+        "kern.maxvnodes": 300000,
+        "kern.poweroff_on_panic": 1,
+        "kern.ostype": "Linux",
+        "security.jail.enforce_statfs": "two",
+        (1, 5): 256
+    })
+    assert results == {
+        "kern.maxvnodes": 0,
+        "kern.poweroff_on_panic": 0,
+        "kern.ostype": errno.EPERM,
+        "security.jail.enforce_statfs": errno.EINVAL,
+        (1, 5): errno.EINVAL
+    }
+    assert simulated_libc.calls["write"] == 2
+    assert freebsd_sysctl.Sysctl("kern.maxvnodes").value == 300000
+    assert freebsd_sysctl.Sysctl("kern.poweroff_on_panic").value == 1
@@ -0,0 +1,142 @@
+# Copyright (c) 2020, Stefan Grönke
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted providing that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED.  IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS
+# OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+import csv
+import gzip
+import io
+import json
+import lzma
+import time
+
+import pytest
+
+import freebsd_sysctl
+import freebsd_sysctl.writer
+import tests.simulated_libc
+
+
+def test_ndjson(simulated_libc):
+    file = io.BytesIO()
+    count = freebsd_sysctl.writer.write(freebsd_sysctl.walk("kern"), file)
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert len(records) == count
+    assert records[0] == dict(
+        name="kern.ostype",
+        oid=list(simulated_libc.nodes_by_name["kern.ostype"].oid),
+        type="string",
+        fmt="A",
+        flags=["RD"],
+        value="FreeBSD"
+    )
+    maxvnodes = records[[x["name"] for x in records].index("kern.maxvnodes")]
+    assert maxvnodes["flags"] == ["RD", "WR"]
+
+
+def test_ndjson_lines_match_record_dict(simulated_libc):
+    file = io.StringIO()
+    freebsd_sysctl.writer.write(
+        freebsd_sysctl.walk(include_descriptions=True),
+        file,
+        include_descriptions=True
+    )
+    expected = []
+    for record in freebsd_sysctl.walk(include_descriptions=True):
+        data = freebsd_sysctl.writer.record_dict(record, True, True)
+        if data is not None:
+            expected.append(json.dumps(data))
+    assert file.getvalue().splitlines() == expected
+
+
+def test_csv(simulated_libc):
+    file = io.StringIO()
+    freebsd_sysctl.writer.write(
+        freebsd_sysctl.walk(include_descriptions=True),
+        file,
+        format="csv",
+        include_descriptions=True
+    )
+    rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+    by_name = {row["name"]: row for row in rows}
+    assert by_name["kern.cp_time"]["value"] == "1200 3 950 17 88000"
+    assert by_name["kern.cp_time"]["description"] == "CPU time statistics"
+    assert json.loads(by_name["vm.loadavg"]["value"])["fscale"] == 2048
+    assert by_name["dev.em.0.%desc"]["flags"] == "RD|DYN"
+
+
+@pytest.mark.parametrize("compression, decompress", [
+    ("gzip", gzip.decompress),
+    ("xz", lzma.decompress)
+])
+def test_compression(simulated_libc, compression, decompress):
+    file = io.BytesIO()
+    count = freebsd_sysctl.writer.write(
+        freebsd_sysctl.walk(),
+        file,
+        compression=compression
+    )
+    assert file.closed is False
+    lines = decompress(file.getvalue()).decode().splitlines()
+    assert len(lines) == count
+
+
+def test_opaque_values_are_hex_encoded(simulated_libc):
+    simulated_libc.add(
+        "kern.proc.all",
+        tests.simulated_libc.CTLTYPE_OPAQUE,
+        "S,kinfo_proc",
+        b"\x00\x01\xff"
+    )
+    simulated_libc.calls.clear()
+    file = io.StringIO()
+    freebsd_sysctl.writer.write(freebsd_sysctl.walk("kern.proc.all"), file)
+    assert json.loads(file.getvalue())["value"] == "0001ff"
+    assert simulated_libc.calls["value"] == 1
+
+
+def test_throughput(benchmark, install_libc):
+    install_libc(tests.simulated_libc.build_large_mib(5000))
+    list(freebsd_sysctl.walk())  # warm the metadata cache
+
+    def write():
+        return freebsd_sysctl.writer.write(
+            freebsd_sysctl.walk(),
+            io.BytesIO(),
+            compression="gzip"
+        )
+
+    assert benchmark.pedantic(write, rounds=3) == 5000
+    if benchmark.stats is not None:
+        rate = 5000 / benchmark.stats.stats.min
+        benchmark.extra_info["records_per_second"] = int(rate)
+
+    # encoding and compressing must not cost much more than the walk itself
+    def best_time(function):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    walk_time = best_time(lambda: list(freebsd_sysctl.walk()))
+    assert best_time(write) < 1.5 * walk_time